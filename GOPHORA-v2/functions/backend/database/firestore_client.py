@@ -4,21 +4,43 @@ Handles all Firestore operations including user data, jobs, and chat history.
 """
 import os
 import base64
+import asyncio
+import uuid
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
 import firebase_admin
 from firebase_admin import credentials, firestore
+from cachetools import LRUCache, TTLCache
 from dotenv import load_dotenv
 import logging
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+SEARCH_TEXT_FIELDS = ('jobTitle', 'description', 'category', 'company', 'source')
+
+# Firestore rejects a WriteBatch with more than 500 operations
+BATCH_WRITE_LIMIT = 500
+
+
+def build_search_text(job_data: Dict[str, Any]) -> str:
+    """Build the lowercased text blob used for keyword job search"""
+    return " ".join(str(job_data.get(field, '')) for field in SEARCH_TEXT_FIELDS).lower()
+
+
 class FirestoreClient:
     """Singleton Firestore client for the application"""
     
     _instance = None
     _db = None
+    # Short-lived cache for the public listing reads that back the UI
+    _read_cache = TTLCache(maxsize=128, ttl=60)
+    # Per-user personalized listings, kept apart so they can't evict the public ones
+    _personalized_cache = TTLCache(maxsize=1024, ttl=60)
+    # (user_id, jobTitle, company) of personalized jobs known to be stored.
+    # Those docs are never deleted, so a hit is always a duplicate and the
+    # scraper can skip the Firestore lookup on every re-seen posting
+    _known_jobs = LRUCache(maxsize=200000)
     
     def __new__(cls):
         if cls._instance is None:
@@ -71,6 +93,54 @@ class FirestoreClient:
             self._initialize()
         return self._db
     
+    def _get_cached(self, key, cache: Optional[TTLCache] = None) -> Optional[List[Dict[str, Any]]]:
+        """Return a copy of a cached listing so callers can mutate it freely"""
+        cached = (self._read_cache if cache is None else cache).get(key)
+        if cached is None:
+            return None
+        return [dict(item) for item in cached]
+    
+    def _set_cached(self, key, items: List[Dict[str, Any]], cache: Optional[TTLCache] = None):
+        """Cache a copy of a listing"""
+        (self._read_cache if cache is None else cache)[key] = [dict(item) for item in items]
+    
+    def invalidate_read_cache(self):
+        """Drop cached listings after a write"""
+        self._read_cache.clear()
+    
+    def invalidate_personalized_cache(self, user_id: Optional[str] = None):
+        """Drop cached personalized listings for one user, or for everyone"""
+        if user_id is None:
+            self._personalized_cache.clear()
+            return
+        for key in [key for key in list(self._personalized_cache.keys()) if key[0] == user_id]:
+            self._personalized_cache.pop(key, None)
+    
+    def _bulk_deactivate(self, query) -> int:
+        """Mark every document matched by a query inactive (blocking; run in a thread)"""
+        bulk_writer = self.db.bulk_writer()
+        count = 0
+        for job in query.stream():
+            bulk_writer.update(job.reference, {'isActive': False})
+            count += 1
+        bulk_writer.close()
+        return count
+    
+    def _add_in_batches(self, collection_ref, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert documents with auto IDs, one WriteBatch per 500; returns the docs committed (blocking; run in a thread)"""
+        written = []
+        for i in range(0, len(docs), BATCH_WRITE_LIMIT):
+            chunk = docs[i:i + BATCH_WRITE_LIMIT]
+            batch = self.db.batch()
+            for doc_data in chunk:
+                batch.set(collection_ref.document(), doc_data)
+            try:
+                batch.commit()
+                written.extend(chunk)
+            except Exception as e:
+                logger.error(f"Error committing batch of {len(chunk)} documents to {collection_ref.id}: {e}")
+        return written
+    
     # ==================== USER OPERATIONS ====================
     
     async def create_user(self, user_id: str, user_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -79,7 +149,7 @@ class FirestoreClient:
             user_ref = self.db.collection('users').document(user_id)
             user_data['createdAt'] = firestore.SERVER_TIMESTAMP
             user_data['lastLogin'] = firestore.SERVER_TIMESTAMP
-            user_ref.set(user_data)
+            await asyncio.to_thread(user_ref.set, user_data)
             logger.info(f"User created: {user_id}")
             return user_data
         except Exception as e:
@@ -90,7 +160,7 @@ class FirestoreClient:
         """Get user by ID"""
         try:
             user_ref = self.db.collection('users').document(user_id)
-            user_doc = user_ref.get()
+            user_doc = await asyncio.to_thread(user_ref.get)
             if user_doc.exists:
                 user_data = user_doc.to_dict()
                 user_data['userId'] = user_id
@@ -105,7 +175,7 @@ class FirestoreClient:
         try:
             users_ref = self.db.collection('users')
             query = users_ref.where('email', '==', email).limit(1)
-            docs = query.stream()
+            docs = await asyncio.to_thread(lambda: list(query.stream()))
             
             for doc in docs:
                 user_data = doc.to_dict()
@@ -116,11 +186,37 @@ class FirestoreClient:
             logger.error(f"Error getting user by email {email}: {e}")
             return None
     
+    async def email_exists(self, email: str) -> bool:
+        """Check whether an account already uses this email (keys only, no profile payload)"""
+        try:
+            users_ref = self.db.collection('users')
+            query = users_ref.where('email', '==', email).select([]).limit(1)
+            docs = await asyncio.to_thread(lambda: list(query.stream()))
+            return len(docs) > 0
+        except Exception as e:
+            logger.error(f"Error checking email {email}: {e}")
+            raise
+    
+    async def get_scraping_profiles(self) -> List[Dict[str, Any]]:
+        """Get the profile fields the personalized scraper needs for every user"""
+        try:
+            query = self.db.collection('users').select(['skills', 'interests', 'experience', 'location'])
+            docs = await asyncio.to_thread(lambda: list(query.stream()))
+            profiles = []
+            for doc in docs:
+                profile = doc.to_dict()
+                profile['userId'] = doc.id
+                profiles.append(profile)
+            return profiles
+        except Exception as e:
+            logger.error(f"Error getting user profiles for scraping: {e}")
+            return []
+    
     async def update_user(self, user_id: str, update_data: Dict[str, Any]) -> bool:
         """Update user profile"""
         try:
             user_ref = self.db.collection('users').document(user_id)
-            user_ref.update(update_data)
+            await asyncio.to_thread(user_ref.update, update_data)
             logger.info(f"User updated: {user_id}")
             return True
         except Exception as e:
@@ -131,7 +227,7 @@ class FirestoreClient:
         """Update user's last login timestamp"""
         try:
             user_ref = self.db.collection('users').document(user_id)
-            user_ref.update({'lastLogin': firestore.SERVER_TIMESTAMP})
+            await asyncio.to_thread(user_ref.update, {'lastLogin': firestore.SERVER_TIMESTAMP})
         except Exception as e:
             logger.error(f"Error updating last login for {user_id}: {e}")
     
@@ -143,14 +239,37 @@ class FirestoreClient:
             jobs_ref = self.db.collection('users').document(user_id).collection('personalizedJobs')
             job_data['scrapedAt'] = firestore.SERVER_TIMESTAMP
             job_data['isActive'] = True
-            doc_ref = jobs_ref.add(job_data)
+            job_data['searchText'] = build_search_text(job_data)
+            doc_ref = await asyncio.to_thread(jobs_ref.add, job_data)
             job_id = doc_ref[1].id
-            logger.info(f"Personalized job added for user {user_id}: {job_id}")
+            self._known_jobs[(user_id, job_data.get('jobTitle'), job_data.get('company'))] = True
+            self.invalidate_personalized_cache(user_id)
+            logger.debug("Personalized job added for user %s: %s", user_id, job_id)
             return job_id
         except Exception as e:
             logger.error(f"Error adding personalized job for {user_id}: {e}")
             raise
     
+    async def add_personalized_jobs(self, user_id: str, jobs: List[Dict[str, Any]]) -> int:
+        """Add several personalized jobs for a user in batched writes; returns the number stored"""
+        try:
+            jobs_ref = self.db.collection('users').document(user_id).collection('personalizedJobs')
+            for job_data in jobs:
+                job_data['scrapedAt'] = firestore.SERVER_TIMESTAMP
+                job_data['isActive'] = True
+                job_data['searchText'] = build_search_text(job_data)
+            written = await asyncio.to_thread(self._add_in_batches, jobs_ref, jobs)
+            # Only jobs from batches that actually committed count as stored;
+            # a failed batch stays unknown so the next run retries it
+            for job_data in written:
+                self._known_jobs[(user_id, job_data.get('jobTitle'), job_data.get('company'))] = True
+            if written:
+                self.invalidate_personalized_cache(user_id)
+            return len(written)
+        except Exception as e:
+            logger.error(f"Error adding personalized jobs for {user_id}: {e}")
+            return 0
+    
     async def get_personalized_jobs(
         self, 
         user_id: str, 
@@ -159,40 +278,68 @@ class FirestoreClient:
         active_only: bool = True
     ) -> List[Dict[str, Any]]:
         """Get personalized jobs for a user with pagination"""
+        cache_key = (user_id, limit, offset, active_only)
+        cached = self._get_cached(cache_key, self._personalized_cache)
+        if cached is not None:
+            return cached
+        
         try:
             jobs_ref = self.db.collection('users').document(user_id).collection('personalizedJobs')
             
-            # Simple query without compound index requirement
-            docs = jobs_ref.stream()
-            jobs = []
-            
-            for doc in docs:
-                job_data = doc.to_dict()
-                # Filter active jobs in code instead of query to avoid index requirement
-                if active_only and not job_data.get('isActive', True):
-                    continue
-                    
-                job_data['jobId'] = doc.id
-                jobs.append(job_data)
+            # Single-field ordering only, so no compound index is needed
+            query = jobs_ref.order_by('scrapedAt', direction=firestore.Query.DESCENDING)
+            end = offset + limit
             
-            # Sort by scrapedAt in code
-            jobs.sort(key=lambda x: x.get('scrapedAt', datetime.min), reverse=True)
+            # Consume the stream lazily and stop once the requested page is filled
+            def read_page():
+                jobs = []
+                for doc in query.stream():
+                    job_data = doc.to_dict()
+                    # Filter active jobs in code instead of query to avoid index requirement
+                    if active_only and not job_data.get('isActive', True):
+                        continue
+                        
+                    job_data['jobId'] = doc.id
+                    jobs.append(job_data)
+                    if len(jobs) >= end:
+                        break
+                return jobs
+            
+            jobs = await asyncio.to_thread(read_page)
             
             # Apply pagination
-            start = offset
-            end = offset + limit
-            return jobs[start:end]
+            jobs = jobs[offset:end]
+            self._set_cached(cache_key, jobs, self._personalized_cache)
+            return jobs
             
         except Exception as e:
             logger.error(f"Error getting personalized jobs for {user_id}: {e}")
             return []
     
+    async def count_personalized_jobs(self, user_id: str, active_only: bool = True) -> int:
+        """Count a user's personalized jobs server-side"""
+        try:
+            query = self.db.collection('users').document(user_id).collection('personalizedJobs')
+            if active_only:
+                query = query.where('isActive', '==', True)
+            result = await asyncio.to_thread(query.count().get)
+            return int(result[0][0].value)
+        except Exception as e:
+            logger.error(f"Error counting personalized jobs for {user_id}: {e}")
+            return 0
+    
     async def check_duplicate_job(self, user_id: str, job_title: str, company: str) -> bool:
         """Check if a job already exists for the user"""
+        key = (user_id, job_title, company)
+        if key in self._known_jobs:
+            return True
+        
         try:
             jobs_ref = self.db.collection('users').document(user_id).collection('personalizedJobs')
-            query = jobs_ref.where('jobTitle', '==', job_title).where('company', '==', company).limit(1)
-            docs = list(query.stream())
+            query = jobs_ref.where('jobTitle', '==', job_title).where('company', '==', company).select([]).limit(1)
+            docs = await asyncio.to_thread(lambda: list(query.stream()))
+            if docs:
+                self._known_jobs[key] = True
             return len(docs) > 0
         except Exception as e:
             logger.error(f"Error checking duplicate job: {e}")
@@ -202,20 +349,16 @@ class FirestoreClient:
         """Mark jobs older than specified days as inactive"""
         try:
             cutoff_date = datetime.now() - timedelta(days=days)
-            
-            # Get all users
-            users_ref = self.db.collection('users')
-            users = users_ref.stream()
-            
-            count = 0
-            for user in users:
-                jobs_ref = user.reference.collection('personalizedJobs')
-                old_jobs = jobs_ref.where('scrapedAt', '<', cutoff_date).where('isActive', '==', True).stream()
-                
-                for job in old_jobs:
-                    job.reference.update({'isActive': False})
-                    count += 1
-            
+
+            # Single collection-group query across every user's personalizedJobs
+            # (needs a collection-group index on isActive + scrapedAt)
+            jobs_ref = self.db.collection_group('personalizedJobs')
+            query = jobs_ref.where('scrapedAt', '<', cutoff_date).where('isActive', '==', True).select([])
+
+            # BulkWriter batches and throttles the updates instead of one RPC per job
+            count = await asyncio.to_thread(self._bulk_deactivate, query)
+
+            self.invalidate_personalized_cache()
             logger.info(f"Deactivated {count} old personalized jobs")
             return count
         except Exception as e:
@@ -230,14 +373,32 @@ class FirestoreClient:
             jobs_ref = self.db.collection('generalJobs')
             job_data['scrapedAt'] = firestore.SERVER_TIMESTAMP
             job_data['isActive'] = True
-            doc_ref = jobs_ref.add(job_data)
+            job_data['searchText'] = build_search_text(job_data)
+            doc_ref = await asyncio.to_thread(jobs_ref.add, job_data)
             job_id = doc_ref[1].id
-            logger.info(f"General job added: {job_id}")
+            self.invalidate_read_cache()
+            logger.debug("General job added: %s", job_id)
             return job_id
         except Exception as e:
             logger.error(f"Error adding general job: {e}")
             raise
     
+    async def add_general_jobs(self, jobs: List[Dict[str, Any]]) -> int:
+        """Add several general jobs in batched writes; returns the number stored"""
+        try:
+            jobs_ref = self.db.collection('generalJobs')
+            for job_data in jobs:
+                job_data['scrapedAt'] = firestore.SERVER_TIMESTAMP
+                job_data['isActive'] = True
+                job_data['searchText'] = build_search_text(job_data)
+            written = await asyncio.to_thread(self._add_in_batches, jobs_ref, jobs)
+            if written:
+                self.invalidate_read_cache()
+            return len(written)
+        except Exception as e:
+            logger.error(f"Error adding general jobs: {e}")
+            return 0
+    
     async def get_general_jobs(
         self, 
         limit: int = 20, 
@@ -246,58 +407,90 @@ class FirestoreClient:
         active_only: bool = True
     ) -> List[Dict[str, Any]]:
         """Get general gig jobs with pagination and filtering"""
+        cache_key = ('generalJobs', limit, offset, category, active_only)
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            jobs_ref = self.db.collection('generalJobs')
+            query = self.db.collection('generalJobs')
             
-            # Simple query without composite index requirement
-            query = jobs_ref.limit(100)  # Get more docs to filter in memory
+            # Filter, sort and paginate server-side so only the requested page is read
+            # (composite indexes on [category,] isActive + scrapedAt desc)
+            if active_only:
+                query = query.where('isActive', '==', True)
+            if category:
+                query = query.where('category', '==', category)
+            query = query.order_by('scrapedAt', direction=firestore.Query.DESCENDING)
+            if offset:
+                query = query.offset(offset)
+            query = query.limit(limit)
             
-            docs = query.stream()
+            # Run the blocking stream off the event loop so callers can overlap reads
+            docs = await asyncio.to_thread(lambda: list(query.stream()))
             jobs = []
             for doc in docs:
                 job_data = doc.to_dict()
                 job_data['jobId'] = doc.id
-                
-                # Filter in memory instead of query
-                if active_only and not job_data.get('isActive', True):
-                    continue
-                if category and job_data.get('category') != category:
-                    continue
-                    
                 jobs.append(job_data)
             
-            # Sort in memory
-            jobs.sort(key=lambda x: x.get('scrapedAt', 0), reverse=True)
-            
-            # Apply pagination in memory
-            return jobs[offset:offset+limit]
+            self._set_cached(cache_key, jobs)
+            return jobs
         except Exception as e:
             logger.error(f"Error getting general jobs: {e}")
             return []
     
+    async def count_general_jobs(self, active_only: bool = True) -> int:
+        """Count general jobs server-side"""
+        try:
+            query = self.db.collection('generalJobs')
+            if active_only:
+                query = query.where('isActive', '==', True)
+            result = await asyncio.to_thread(query.count().get)
+            return int(result[0][0].value)
+        except Exception as e:
+            logger.error(f"Error counting general jobs: {e}")
+            return 0
+    
     async def check_duplicate_general_job(self, job_title: str, source_link: str) -> bool:
         """Check if a general job already exists"""
         try:
             jobs_ref = self.db.collection('generalJobs')
-            query = jobs_ref.where('sourceLink', '==', source_link).limit(1)
-            docs = list(query.stream())
+            query = jobs_ref.where('sourceLink', '==', source_link).select([]).limit(1)
+            docs = await asyncio.to_thread(lambda: list(query.stream()))
             return len(docs) > 0
         except Exception as e:
             logger.error(f"Error checking duplicate general job: {e}")
             return False
-    
+
+    async def get_existing_general_job_links(self, source_links: List[str]) -> set:
+        """Return the subset of source links that already exist as general jobs"""
+        try:
+            jobs_ref = self.db.collection('generalJobs')
+            links = list(dict.fromkeys(link for link in source_links if link))
+            existing = set()
+
+            # Firestore caps 'in' filters at 30 values, so query in chunks
+            for i in range(0, len(links), 30):
+                query = jobs_ref.where('sourceLink', 'in', links[i:i + 30]).select(['sourceLink'])
+                for doc in await asyncio.to_thread(lambda: list(query.stream())):
+                    existing.add(doc.get('sourceLink'))
+
+            return existing
+        except Exception as e:
+            logger.error(f"Error checking duplicate general jobs: {e}")
+            return set()
+
     async def deactivate_old_general_jobs(self, days: int = 7):
         """Mark general jobs older than specified days as inactive"""
         try:
             cutoff_date = datetime.now() - timedelta(days=days)
             jobs_ref = self.db.collection('generalJobs')
-            old_jobs = jobs_ref.where('scrapedAt', '<', cutoff_date).where('isActive', '==', True).stream()
-            
-            count = 0
-            for job in old_jobs:
-                job.reference.update({'isActive': False})
-                count += 1
+            query = jobs_ref.where('scrapedAt', '<', cutoff_date).where('isActive', '==', True).select([])
             
+            count = await asyncio.to_thread(self._bulk_deactivate, query)
+
+            self.invalidate_read_cache()
             logger.info(f"Deactivated {count} old general jobs")
             return count
         except Exception as e:
@@ -306,21 +499,28 @@ class FirestoreClient:
     
     # ==================== CHAT HISTORY OPERATIONS ====================
     
-    async def add_chat_message(self, user_id: str, message_data: Dict[str, Any]):
-        """Add a chat message to user's history"""
+    async def add_chat_messages(self, user_id: str, messages: List[Dict[str, Any]]):
+        """Add several chat messages to user's history in one batched write"""
         try:
             chat_ref = self.db.collection('users').document(user_id).collection('chatHistory')
-            message_data['timestamp'] = firestore.SERVER_TIMESTAMP
-            chat_ref.add(message_data)
+            batch = self.db.batch()
+            # A batch shares one server commit time, so the messages tie on
+            # timestamp; Firestore breaks ties by document ID, so give them a
+            # shared prefix and an index suffix to keep their order
+            prefix = uuid.uuid4().hex
+            for i, message_data in enumerate(messages):
+                message_data['timestamp'] = firestore.SERVER_TIMESTAMP
+                batch.set(chat_ref.document(f"{prefix}-{i:03d}"), message_data)
+            await asyncio.to_thread(batch.commit)
         except Exception as e:
-            logger.error(f"Error adding chat message for {user_id}: {e}")
+            logger.error(f"Error adding chat messages for {user_id}: {e}")
     
     async def get_chat_history(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Get recent chat history for a user"""
         try:
             chat_ref = self.db.collection('users').document(user_id).collection('chatHistory')
             query = chat_ref.order_by('timestamp', direction=firestore.Query.DESCENDING).limit(limit)
-            docs = query.stream()
+            docs = await asyncio.to_thread(lambda: list(query.stream()))
             
             messages = []
             for doc in docs:
@@ -338,7 +538,7 @@ class FirestoreClient:
         """Store refresh token for a user"""
         try:
             token_ref = self.db.collection('users').document(user_id).collection('refreshTokens')
-            token_ref.add({
+            await asyncio.to_thread(token_ref.add, {
                 'token': token,
                 'expiresAt': expires_at,
                 'createdAt': firestore.SERVER_TIMESTAMP,
@@ -351,8 +551,8 @@ class FirestoreClient:
         """Check if refresh token is valid"""
         try:
             tokens_ref = self.db.collection('users').document(user_id).collection('refreshTokens')
-            query = tokens_ref.where('token', '==', token).where('isValid', '==', True).limit(1)
-            docs = list(query.stream())
+            query = tokens_ref.where('token', '==', token).where('isValid', '==', True).select(['expiresAt']).limit(1)
+            docs = await asyncio.to_thread(lambda: list(query.stream()))
             
             if not docs:
                 return False
@@ -364,7 +564,7 @@ class FirestoreClient:
                 return True
             
             # Token expired, invalidate it
-            docs[0].reference.update({'isValid': False})
+            await asyncio.to_thread(docs[0].reference.update, {'isValid': False})
             return False
         except Exception as e:
             logger.error(f"Error validating refresh token: {e}")
@@ -374,38 +574,57 @@ class FirestoreClient:
         """Invalidate a specific refresh token"""
         try:
             tokens_ref = self.db.collection('users').document(user_id).collection('refreshTokens')
-            query = tokens_ref.where('token', '==', token).limit(1)
-            docs = list(query.stream())
+            query = tokens_ref.where('token', '==', token).select([]).limit(1)
+            docs = await asyncio.to_thread(lambda: list(query.stream()))
             
             for doc in docs:
-                doc.reference.update({'isValid': False})
+                await asyncio.to_thread(doc.reference.update, {'isValid': False})
         except Exception as e:
             logger.error(f"Error invalidating refresh token: {e}")
     
+    async def rotate_refresh_token(self, user_id: str, old_token: str, new_token: str, expires_at: datetime):
+        """Invalidate a refresh token and store its replacement in one atomic batch"""
+        try:
+            tokens_ref = self.db.collection('users').document(user_id).collection('refreshTokens')
+            query = tokens_ref.where('token', '==', old_token).select([]).limit(1)
+            
+            batch = self.db.batch()
+            for doc in await asyncio.to_thread(lambda: list(query.stream())):
+                batch.update(doc.reference, {'isValid': False})
+            batch.set(tokens_ref.document(), {
+                'token': new_token,
+                'expiresAt': expires_at,
+                'createdAt': firestore.SERVER_TIMESTAMP,
+                'isValid': True
+            })
+            await asyncio.to_thread(batch.commit)
+        except Exception as e:
+            logger.error(f"Error rotating refresh token for {user_id}: {e}")
+            raise
+    
     async def get_refresh_token_owner(self, token: str) -> Optional[str]:
         """Find which user owns this refresh token"""
         try:
-            # Query all users
-            users_ref = self.db.collection('users')
-            users = users_ref.stream()
-            
-            for user in users:
-                user_id = user.id
-                tokens_ref = user.reference.collection('refreshTokens')
-                query = tokens_ref.where('token', '==', token).where('isValid', '==', True).limit(1)
-                docs = list(query.stream())
-                
-                if docs:
-                    token_data = docs[0].to_dict()
-                    expires_at = token_data.get('expiresAt')
-                    
-                    # Check if expired
-                    if expires_at and datetime.now() < expires_at:
-                        return user_id
-                    else:
-                        # Token expired, invalidate it
-                        docs[0].reference.update({'isValid': False})
+            # One collection-group query across every user's refreshTokens
+            # (needs the COLLECTION_GROUP composite index on token + isValid in firestore.indexes.json)
+            query = self.db.collection_group('refreshTokens').where('token', '==', token).where(
+                'isValid', '==', True
+            ).select(['expiresAt']).limit(1)
+            docs = await asyncio.to_thread(lambda: list(query.stream()))
+            
+            if not docs:
+                return None
             
+            token_data = docs[0].to_dict()
+            expires_at = token_data.get('expiresAt')
+            
+            # Check if expired
+            if expires_at and datetime.now() < expires_at:
+                # users/{userId}/refreshTokens/{tokenId}
+                return docs[0].reference.parent.parent.id
+            
+            # Token expired, invalidate it
+            await asyncio.to_thread(docs[0].reference.update, {'isValid': False})
             return None
         except Exception as e:
             logger.error(f"Error finding refresh token owner: {e}")
@@ -419,8 +638,9 @@ class FirestoreClient:
             opps_ref = self.db.collection('opportunities')
             opportunity_data['createdAt'] = firestore.SERVER_TIMESTAMP
             opportunity_data['updatedAt'] = firestore.SERVER_TIMESTAMP
-            doc_ref = opps_ref.add(opportunity_data)
+            doc_ref = await asyncio.to_thread(opps_ref.add, opportunity_data)
             opportunity_id = doc_ref[1].id
+            self.invalidate_read_cache()
             logger.info(f"Provider opportunity created: {opportunity_id}")
             return opportunity_id
         except Exception as e:
@@ -431,7 +651,7 @@ class FirestoreClient:
         """Get a single opportunity by ID"""
         try:
             opp_ref = self.db.collection('opportunities').document(opportunity_id)
-            opp_doc = opp_ref.get()
+            opp_doc = await asyncio.to_thread(opp_ref.get)
             if opp_doc.exists:
                 data = opp_doc.to_dict()
                 data['id'] = opp_doc.id
@@ -445,7 +665,7 @@ class FirestoreClient:
         """Get a single general job by ID"""
         try:
             job_ref = self.db.collection('generalJobs').document(job_id)
-            job_doc = job_ref.get()
+            job_doc = await asyncio.to_thread(job_ref.get)
             if job_doc.exists:
                 data = job_doc.to_dict()
                 data['jobId'] = job_doc.id
@@ -455,6 +675,31 @@ class FirestoreClient:
             logger.error(f"Error getting general job {job_id}: {e}")
             return None
     
+    async def get_opportunity_or_general_job(self, item_id: str) -> tuple:
+        """Look an ID up as both a provider opportunity and a general job in one multi-get"""
+        try:
+            opp_ref = self.db.collection('opportunities').document(item_id)
+            job_ref = self.db.collection('generalJobs').document(item_id)
+            snapshots = await asyncio.to_thread(lambda: list(self.db.get_all([opp_ref, job_ref])))
+            
+            # get_all doesn't preserve request order; match snapshots back by path
+            found = {snap.reference.path: snap for snap in snapshots if snap.exists}
+            
+            opportunity = None
+            if opp_ref.path in found:
+                opportunity = found[opp_ref.path].to_dict()
+                opportunity['id'] = item_id
+            
+            general_job = None
+            if job_ref.path in found:
+                general_job = found[job_ref.path].to_dict()
+                general_job['jobId'] = item_id
+            
+            return opportunity, general_job
+        except Exception as e:
+            logger.error(f"Error getting opportunity or general job {item_id}: {e}")
+            return None, None
+    
     async def get_provider_opportunities(
         self, 
         provider_id: str, 
@@ -472,7 +717,7 @@ class FirestoreClient:
                 query = query.where('isActive', '==', True)
             
             query = query.limit(limit)
-            docs = query.stream()
+            docs = await asyncio.to_thread(lambda: list(query.stream()))
             
             opportunities = []
             for doc in docs:
@@ -491,27 +736,27 @@ class FirestoreClient:
         active_only: bool = True
     ) -> List[Dict[str, Any]]:
         """Get all provider opportunities"""
+        cache_key = ('opportunities', limit, active_only)
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            opps_ref = self.db.collection('opportunities')
-            # Simple query without index requirement
-            query = opps_ref.limit(100)
-            docs = query.stream()
+            query = self.db.collection('opportunities')
+            # Filter, sort and limit server-side (isActive + createdAt composite index)
+            if active_only:
+                query = query.where('isActive', '==', True)
+            query = query.order_by('createdAt', direction=firestore.Query.DESCENDING).limit(limit)
+            docs = await asyncio.to_thread(lambda: list(query.stream()))
             
             opportunities = []
             for doc in docs:
                 opp_data = doc.to_dict()
                 opp_data['id'] = doc.id
-                
-                # Filter in memory
-                if active_only and not opp_data.get('isActive', True):
-                    continue
-                    
                 opportunities.append(opp_data)
             
-            # Sort in memory
-            opportunities.sort(key=lambda x: x.get('createdAt', 0), reverse=True)
-            
-            return opportunities[:limit]
+            self._set_cached(cache_key, opportunities)
+            return opportunities
         except Exception as e:
             logger.error(f"Error getting all provider opportunities: {e}")
             return []
@@ -521,7 +766,8 @@ class FirestoreClient:
         try:
             opp_ref = self.db.collection('opportunities').document(opportunity_id)
             update_data['updatedAt'] = firestore.SERVER_TIMESTAMP
-            opp_ref.update(update_data)
+            await asyncio.to_thread(opp_ref.update, update_data)
+            self.invalidate_read_cache()
             logger.info(f"Opportunity updated: {opportunity_id}")
             return True
         except Exception as e:
@@ -532,7 +778,8 @@ class FirestoreClient:
         """Delete a provider opportunity"""
         try:
             opp_ref = self.db.collection('opportunities').document(opportunity_id)
-            opp_ref.delete()
+            await asyncio.to_thread(opp_ref.delete)
+            self.invalidate_read_cache()
             logger.info(f"Opportunity deleted: {opportunity_id}")
             return True
         except Exception as e:
@@ -12,6 +12,7 @@ Integrates:
 """
 import os
 import sys
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
@@ -21,7 +22,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -32,6 +33,7 @@ from backend.routers import auth, jobs, chat, user, opportunities, resumes
 
 # Import services
 from backend.services.scheduler import scraper_scheduler
+from backend.services.scraper_personalized import personalized_scraper
 
 load_dotenv()
 logging.basicConfig(
@@ -66,6 +68,7 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down...")
     scraper_scheduler.stop()
     logger.info("Background scheduler stopped")
+    await personalized_scraper.aclose()
 
 # Create FastAPI app
 app = FastAPI(
@@ -74,6 +77,7 @@ app = FastAPI(
     version="2.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -92,8 +96,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Gzip compression
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Gzip compression - level 5 gets most of level 9's ratio on JSON at a fraction of the CPU
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=5)
 
 # Request logging middleware
 @app.middleware("http")
@@ -140,7 +144,7 @@ async def health_check(request: Request):
         
         # Test Firestore connectivity
         try:
-            firestore_client.db.collection('_health_check').limit(1).get()
+            await asyncio.to_thread(firestore_client.db.collection('_health_check').limit(1).get)
             db_status = "connected"
         except:
             db_status = "disconnected"
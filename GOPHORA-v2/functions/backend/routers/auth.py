@@ -2,11 +2,15 @@
 Authentication Router
 Implements JWT-based authentication with refresh tokens
 """
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr
 from typing import Optional
+import hashlib
 import logging
+import time
+
+from cachetools import TTLCache
 
 from backend.database.firestore_client import firestore_client
 from backend.utils.jwt_handler import jwt_handler
@@ -17,6 +21,26 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# Recently authenticated users keyed by a digest of their access token.
+# Entries hold (user, token exp) so an expired token is never served from cache.
+# The cache is per process, so invalidation can't reach other instances; the
+# TTL bounds how long a profile change or account deletion goes unseen there.
+USER_CACHE_TTL = 60
+_user_cache = TTLCache(maxsize=50000, ttl=USER_CACHE_TTL)
+# user_id -> cache keys of that user's tokens, so invalidation needn't scan the cache
+_user_cache_keys = TTLCache(maxsize=50000, ttl=USER_CACHE_TTL)
+
+
+def _token_cache_key(token: str) -> bytes:
+    """Digest a bearer token for use as a cache key"""
+    return hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+
+
+def invalidate_user_cache(user_id: str):
+    """Drop this process's cached auth lookups for a user after their profile changes"""
+    for key in _user_cache_keys.pop(user_id, ()):
+        _user_cache.pop(key, None)
+
 # ==================== PYDANTIC MODELS ====================
 
 class RegisterRequest(BaseModel):
@@ -52,6 +76,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    cache_key = _token_cache_key(token)
+    cached = _user_cache.get(cache_key)
+    if cached is not None:
+        user, expires_at = cached
+        if expires_at and time.time() < expires_at:
+            return dict(user)
+        _user_cache.pop(cache_key, None)
+    
     # Decode token
     payload = jwt_handler.decode_token(token)
     if not payload:
@@ -66,6 +98,9 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     if not user:
         raise credentials_exception
     
+    _user_cache[cache_key] = (dict(user), payload.get("exp"))
+    # Re-set so the index entry lives at least as long as the cache entry it points at
+    _user_cache_keys[user_id] = _user_cache_keys.get(user_id, set()) | {cache_key}
     return user
 
 # ==================== ENDPOINTS ====================
@@ -81,8 +116,7 @@ async def register(user_data: RegisterRequest):
     """
     try:
         # Check if user already exists
-        existing_user = await firestore_client.get_user_by_email(user_data.email)
-        if existing_user:
+        if await firestore_client.email_exists(user_data.email):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
@@ -126,13 +160,13 @@ async def register(user_data: RegisterRequest):
         )
 
 @router.post("/login", response_model=LoginResponse)
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(background_tasks: BackgroundTasks, form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Login with email and password
     
     - Validates credentials
     - Returns access token (7 days) and refresh token (30 days)
-    - Updates last login timestamp
+    - Updates last login timestamp (after the response is sent)
     """
     try:
         # Get user by email
@@ -165,8 +199,8 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         # Store refresh token in Firestore
         await firestore_client.store_refresh_token(user_id, refresh_token, expires_at)
         
-        # Update last login
-        await firestore_client.update_last_login(user_id)
+        # Update last login once the response is out; the client doesn't need it
+        background_tasks.add_task(firestore_client.update_last_login, user_id)
         
         logger.info(f"User logged in: {user_id}")
         
@@ -225,11 +259,8 @@ async def refresh_token(request: RefreshRequest):
         # Optionally create new refresh token (token rotation for security)
         new_refresh_token, expires_at = jwt_handler.create_refresh_token(user_id)
         
-        # Invalidate old refresh token
-        await firestore_client.invalidate_refresh_token(user_id, refresh_token)
-        
-        # Store new refresh token
-        await firestore_client.store_refresh_token(user_id, new_refresh_token, expires_at)
+        # Swap old refresh token for the new one in a single atomic write
+        await firestore_client.rotate_refresh_token(user_id, refresh_token, new_refresh_token, expires_at)
         
         logger.info(f"Token refreshed for user: {user_id}")
         
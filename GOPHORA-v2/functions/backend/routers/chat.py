@@ -3,9 +3,11 @@ Chat Router
 Gophora AI chatbot endpoints with LangChain integration
 """
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import logging
+import orjson
 
 from backend.services.chatbot import gophora_ai
 from backend.routers.auth import get_current_user
@@ -75,6 +77,49 @@ async def chat(
             detail="Chat processing failed"
         )
 
+def _sse_event(payload: Dict[str, Any]) -> bytes:
+    """Format a payload as a Server-Sent Events frame"""
+    return b"data: " + orjson.dumps(payload, default=str) + b"\n\n"
+
+@router.post("/stream")
+async def chat_stream(
+    request: ChatRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Chat with Gophora AI, streaming the reply as Server-Sent Events
+    
+    - General Q&A replies arrive as {"delta": ...} frames while being generated
+    - Job searches arrive as a single {"reply": ..., "opportunities": [...]} frame
+    - The stream ends with {"done": true}
+    
+    Requires authentication
+    """
+    user_id = current_user.get('userId')
+    
+    async def event_stream():
+        try:
+            intent = await gophora_ai.detect_intent(request.message)
+            
+            if intent == 'job_search':
+                response = await gophora_ai.handle_job_search(user_id, request.message)
+                yield _sse_event(response)
+            else:
+                async for delta in gophora_ai.stream_general_qa(user_id, request.message):
+                    yield _sse_event({"delta": delta})
+            
+            yield _sse_event({"done": True})
+            
+        except Exception as e:
+            logger.error(f"Error in chat stream: {e}")
+            yield _sse_event({"error": "Chat processing failed", "done": True})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 @router.post("/clear-history")
 async def clear_chat_history(current_user: dict = Depends(get_current_user)):
     """
@@ -5,6 +5,7 @@ Endpoints for retrieving personalized and general jobs
 from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
 from typing import List, Optional
+import asyncio
 import logging
 
 from backend.database.firestore_client import firestore_client
@@ -188,23 +189,16 @@ async def get_job_stats(current_user: dict = Depends(get_current_user)):
     try:
         user_id = current_user.get('userId')
         
-        # Get personalized jobs count
-        personalized_jobs = await firestore_client.get_personalized_jobs(
-            user_id,
-            limit=1000,
-            active_only=True
-        )
-        
-        # Get general jobs count
-        general_jobs = await firestore_client.get_general_jobs(
-            limit=1000,
-            active_only=True
+        # Count server-side with aggregation queries instead of fetching the jobs
+        personalized_count, general_count = await asyncio.gather(
+            firestore_client.count_personalized_jobs(user_id, active_only=True),
+            firestore_client.count_general_jobs(active_only=True)
         )
         
         return {
-            "personalized_jobs_count": len(personalized_jobs),
-            "general_jobs_count": len(general_jobs),
-            "total_jobs": len(personalized_jobs) + len(general_jobs)
+            "personalized_jobs_count": personalized_count,
+            "general_jobs_count": general_count,
+            "total_jobs": personalized_count + general_count
         }
         
     except Exception as e:
@@ -6,6 +6,7 @@ Maps to jobs functionality and adds provider opportunity management
 from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel, Field
 from typing import List, Optional
+import asyncio
 import logging
 from datetime import datetime
 
@@ -63,6 +64,38 @@ class UpdateOpportunityRequest(BaseModel):
     salary: Optional[str] = None
     isActive: Optional[bool] = None
 
+# ==================== HELPERS ====================
+
+def _timestamp_str(value) -> Optional[str]:
+    """Normalize a Firestore timestamp (or string) for OpportunityResponse"""
+    if value and hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if value:
+        return str(value)
+    return None
+
+def _general_job_to_opportunity(job: dict) -> dict:
+    """Map a scraped general job onto the opportunity shape"""
+    return {
+        "id": job.get('jobId', ''),
+        "title": job.get('jobTitle', ''),
+        "type": job.get('category', 'job'),
+        "location": job.get('location', 'Remote'),
+        "description": job.get('description', ''),
+        "requirements": job.get('requirements', ''),
+        "company": job.get('company', ''),
+        "tags": [],
+        "salary": job.get('estimatedPay', ''),
+        "source": job.get('source', ''),
+        "sourceLink": job.get('sourceLink', ''),
+        "createdAt": _timestamp_str(job.get('scrapedAt')),
+        "isActive": job.get('isActive', True)
+    }
+
+def _provider_opportunity(opp: dict) -> dict:
+    """Provider opportunity with its createdAt normalized"""
+    return {**opp, "createdAt": _timestamp_str(opp.get('createdAt'))}
+
 # ==================== ENDPOINTS ====================
 
 @router.get("/recommend", response_model=List[OpportunityResponse])
@@ -86,13 +119,6 @@ async def get_recommended_opportunities(
         # Transform to opportunity format
         opportunities = []
         for job in jobs:
-            # Convert timestamp to string
-            scraped_at = job.get('scrapedAt')
-            if scraped_at and hasattr(scraped_at, 'isoformat'):
-                scraped_at = scraped_at.isoformat()
-            elif scraped_at:
-                scraped_at = str(scraped_at)
-            
             opportunity = {
                 "id": job.get('jobId', ''),
                 "title": job.get('jobTitle', ''),
@@ -105,7 +131,7 @@ async def get_recommended_opportunities(
                 "salary": job.get('salary', ''),
                 "source": job.get('source', ''),
                 "sourceLink": job.get('sourceLink', ''),
-                "createdAt": scraped_at,
+                "createdAt": _timestamp_str(job.get('scrapedAt')),
                 "isActive": job.get('isActive', True),
                 "aiValidationScore": job.get('aiValidationScore'),
                 "skillMatches": job.get('skillMatches', [])
@@ -131,56 +157,22 @@ async def get_all_opportunities(
     No authentication required
     """
     try:
-        # Get general jobs
-        jobs = await firestore_client.get_general_jobs(
-            limit=100,
-            category=category,
-            active_only=True
+        # Get general jobs and provider opportunities concurrently
+        jobs, provider_opportunities = await asyncio.gather(
+            firestore_client.get_general_jobs(
+                limit=100,
+                category=category,
+                active_only=True
+            ),
+            firestore_client.get_all_provider_opportunities(
+                limit=100,
+                active_only=True
+            )
         )
         
-        # Get provider opportunities
-        provider_opportunities = await firestore_client.get_all_provider_opportunities(
-            limit=100,
-            active_only=True
-        )
-        
-        # Transform general jobs
-        opportunities = []
-        for job in jobs:
-            # Convert timestamp to string if needed
-            scraped_at = job.get('scrapedAt')
-            if scraped_at and hasattr(scraped_at, 'isoformat'):
-                scraped_at = scraped_at.isoformat()
-            elif scraped_at:
-                scraped_at = str(scraped_at)
-            
-            opportunity = {
-                "id": job.get('jobId', ''),
-                "title": job.get('jobTitle', ''),
-                "type": job.get('category', 'job'),
-                "location": job.get('location', 'Remote'),
-                "description": job.get('description', ''),
-                "requirements": job.get('requirements', ''),
-                "company": job.get('company', ''),
-                "tags": [],
-                "salary": job.get('estimatedPay', ''),
-                "source": job.get('source', ''),
-                "sourceLink": job.get('sourceLink', ''),
-                "createdAt": scraped_at,
-                "isActive": job.get('isActive', True)
-            }
-            opportunities.append(OpportunityResponse(**opportunity))
-        
-        # Add provider opportunities
-        for opp in provider_opportunities:
-            # Convert timestamp to string
-            created_at = opp.get('createdAt')
-            if created_at and hasattr(created_at, 'isoformat'):
-                opp['createdAt'] = created_at.isoformat()
-            elif created_at:
-                opp['createdAt'] = str(created_at)
-            
-            opportunities.append(OpportunityResponse(**opp))
+        # Transform general jobs, then add provider opportunities
+        opportunities = [OpportunityResponse(**_general_job_to_opportunity(job)) for job in jobs]
+        opportunities.extend(OpportunityResponse(**_provider_opportunity(opp)) for opp in provider_opportunities)
         
         logger.info(f"Retrieved {len(opportunities)} total opportunities")
         return opportunities
@@ -211,7 +203,7 @@ async def get_my_opportunities(
         )
         
         logger.info(f"Retrieved {len(opportunities)} opportunities for provider {user_id}")
-        return [OpportunityResponse(**opp) for opp in opportunities]
+        return [OpportunityResponse(**_provider_opportunity(opp)) for opp in opportunities]
         
     except Exception as e:
         logger.error(f"Error fetching provider opportunities: {e}")
@@ -227,32 +219,14 @@ async def get_opportunity_by_id(opportunity_id: str):
     Checks both provider opportunities and scraped jobs
     """
     try:
-        # First check provider opportunities
-        opportunity = await firestore_client.get_opportunity_by_id(opportunity_id)
+        # Fetch both candidates in one round trip; provider opportunities win
+        opportunity, general_job = await firestore_client.get_opportunity_or_general_job(opportunity_id)
         
         if opportunity:
-            return OpportunityResponse(**opportunity)
-        
-        # If not found in provider opportunities, check general jobs
-        general_job = await firestore_client.get_general_job_by_id(opportunity_id)
+            return OpportunityResponse(**_provider_opportunity(opportunity))
         
         if general_job:
-            opportunity = {
-                "id": general_job.get('jobId', ''),
-                "title": general_job.get('jobTitle', ''),
-                "type": general_job.get('category', 'job'),
-                "location": general_job.get('location', 'Remote'),
-                "description": general_job.get('description', ''),
-                "requirements": general_job.get('requirements', ''),
-                "company": general_job.get('company', ''),
-                "tags": [],
-                "salary": general_job.get('estimatedPay', ''),
-                "source": general_job.get('source', ''),
-                "sourceLink": general_job.get('sourceLink', ''),
-                "createdAt": general_job.get('scrapedAt', ''),
-                "isActive": general_job.get('isActive', True)
-            }
-            return OpportunityResponse(**opportunity)
+            return OpportunityResponse(**_general_job_to_opportunity(general_job))
         
         raise HTTPException(status_code=404, detail="Opportunity not found")
         
@@ -301,7 +275,7 @@ async def create_opportunity(
         created = await firestore_client.get_opportunity_by_id(opportunity_id)
         
         logger.info(f"Opportunity created by provider {user_id}: {opportunity_id}")
-        return OpportunityResponse(**created)
+        return OpportunityResponse(**_provider_opportunity(created))
         
     except HTTPException:
         raise
@@ -335,7 +309,7 @@ async def update_opportunity(
             raise HTTPException(status_code=403, detail="Not authorized to update this opportunity")
         
         # Prepare update data (only non-None fields)
-        update_dict = {k: v for k, v in update_data.dict().items() if v is not None}
+        update_dict = update_data.model_dump(exclude_none=True)
         
         # Update in Firestore
         success = await firestore_client.update_opportunity(opportunity_id, update_dict)
@@ -343,11 +317,12 @@ async def update_opportunity(
         if not success:
             raise HTTPException(status_code=500, detail="Failed to update opportunity")
         
-        # Get updated opportunity
-        updated = await firestore_client.get_opportunity_by_id(opportunity_id)
+        # The update is a blind write; merge it over the copy we already read
+        # for the ownership check instead of reading the document back
+        updated = {**existing, **update_dict}
         
         logger.info(f"Opportunity updated by provider {user_id}: {opportunity_id}")
-        return OpportunityResponse(**updated)
+        return OpportunityResponse(**_provider_opportunity(updated))
         
     except HTTPException:
         raise
@@ -4,8 +4,11 @@ Resume endpoints for managing user resumes
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List, Optional
 from datetime import datetime
+from google.api_core.exceptions import NotFound
+from firebase_admin import firestore
 from backend.database.firestore_client import firestore_client
-from backend.routers.auth import get_current_user
+from backend.routers.auth import get_current_user, invalidate_user_cache
+import asyncio
 import uuid
 
 router = APIRouter(prefix="/user", tags=["resumes"])
@@ -14,19 +17,20 @@ router = APIRouter(prefix="/user", tags=["resumes"])
 async def create_resume(resume_data: dict, current_user: dict = Depends(get_current_user)):
     """Create a new resume for user"""
     try:
-        user_id = current_user.get("user_id")
+        user_id = current_user.get("userId")
+        now = datetime.now().isoformat()
         
         resume = {
             "id": str(uuid.uuid4()),
             "userId": user_id,
             **resume_data,
-            "createdAt": datetime.now().isoformat(),
-            "updatedAt": datetime.now().isoformat()
+            "createdAt": now,
+            "updatedAt": now
         }
         
         # Store in Firestore
         resumes_ref = firestore_client.db.collection('users').document(user_id).collection('resumes')
-        resumes_ref.document(resume["id"]).set(resume)
+        await asyncio.to_thread(resumes_ref.document(resume["id"]).set, resume)
         
         return {
             "success": True,
@@ -40,13 +44,14 @@ async def create_resume(resume_data: dict, current_user: dict = Depends(get_curr
 async def get_user_resumes(current_user: dict = Depends(get_current_user)):
     """Get all resumes for user"""
     try:
-        user_id = current_user.get("user_id")
+        user_id = current_user.get("userId")
         
         resumes_ref = firestore_client.db.collection('users').document(user_id).collection('resumes')
-        resumes = [doc.to_dict() for doc in resumes_ref.stream()]
         
-        # Sort by createdAt descending
-        resumes.sort(key=lambda x: x.get('createdAt', ''), reverse=True)
+        # Newest first, sorted by Firestore (createdAt is an ISO string, so it orders chronologically)
+        query = resumes_ref.order_by('createdAt', direction=firestore.Query.DESCENDING)
+        docs = await asyncio.to_thread(lambda: list(query.stream()))
+        resumes = [doc.to_dict() for doc in docs]
         
         return {
             "success": True,
@@ -59,10 +64,10 @@ async def get_user_resumes(current_user: dict = Depends(get_current_user)):
 async def get_resume(resume_id: str, current_user: dict = Depends(get_current_user)):
     """Get specific resume"""
     try:
-        user_id = current_user.get("user_id")
+        user_id = current_user.get("userId")
         
         resumes_ref = firestore_client.db.collection('users').document(user_id).collection('resumes')
-        resume_doc = resumes_ref.document(resume_id).get()
+        resume_doc = await asyncio.to_thread(resumes_ref.document(resume_id).get)
         
         if not resume_doc.exists:
             raise HTTPException(status_code=404, detail="Resume not found")
@@ -78,10 +83,10 @@ async def get_resume(resume_id: str, current_user: dict = Depends(get_current_us
 async def update_resume(resume_id: str, resume_data: dict, current_user: dict = Depends(get_current_user)):
     """Update resume"""
     try:
-        user_id = current_user.get("user_id")
+        user_id = current_user.get("userId")
         
         resumes_ref = firestore_client.db.collection('users').document(user_id).collection('resumes')
-        resume_doc = resumes_ref.document(resume_id).get()
+        resume_doc = await asyncio.to_thread(resumes_ref.document(resume_id).get)
         
         if not resume_doc.exists:
             raise HTTPException(status_code=404, detail="Resume not found")
@@ -93,7 +98,7 @@ async def update_resume(resume_id: str, resume_data: dict, current_user: dict =
             "updatedAt": datetime.now().isoformat()
         }
         
-        resumes_ref.document(resume_id).set(updated_resume)
+        await asyncio.to_thread(resumes_ref.document(resume_id).set, updated_resume)
         
         return {
             "success": True,
@@ -107,21 +112,25 @@ async def update_resume(resume_id: str, resume_data: dict, current_user: dict =
 async def delete_resume(resume_id: str, current_user: dict = Depends(get_current_user)):
     """Delete resume"""
     try:
-        user_id = current_user.get("user_id")
+        user_id = current_user.get("userId")
         
         resumes_ref = firestore_client.db.collection('users').document(user_id).collection('resumes')
-        resume_doc = resumes_ref.document(resume_id).get()
         
-        if not resume_doc.exists:
+        # Delete with an exists precondition instead of a separate read
+        try:
+            await asyncio.to_thread(
+                resumes_ref.document(resume_id).delete,
+                option=firestore_client.db.write_option(exists=True)
+            )
+        except NotFound:
             raise HTTPException(status_code=404, detail="Resume not found")
         
-        # Delete resume
-        resumes_ref.document(resume_id).delete()
-        
         return {
             "success": True,
             "message": "Resume deleted successfully"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -129,10 +138,10 @@ async def delete_resume(resume_id: str, current_user: dict = Depends(get_current
 async def set_primary_resume(resume_id: str, current_user: dict = Depends(get_current_user)):
     """Set a resume as primary (for job matching)"""
     try:
-        user_id = current_user.get("user_id")
+        user_id = current_user.get("userId")
         
         resumes_ref = firestore_client.db.collection('users').document(user_id).collection('resumes')
-        resume_doc = resumes_ref.document(resume_id).get()
+        resume_doc = await asyncio.to_thread(resumes_ref.document(resume_id).get)
         
         if not resume_doc.exists:
             raise HTTPException(status_code=404, detail="Resume not found")
@@ -142,7 +151,7 @@ async def set_primary_resume(resume_id: str, current_user: dict = Depends(get_cu
         resume_data = resume_doc.to_dict()
         
         # Update user profile with resume details for job matching
-        user_ref.update({
+        await asyncio.to_thread(user_ref.update, {
             "primaryResumeId": resume_id,
             "skills": resume_data.get("skills", []),
             "headline": resume_data.get("headline", ""),
@@ -153,6 +162,9 @@ async def set_primary_resume(resume_id: str, current_user: dict = Depends(get_cu
             "bio": resume_data.get("bio", ""),
             "updatedAt": datetime.now().isoformat()
         })
+        # _user_cache is per process: other workers/instances keep serving the
+        # old profile until their entry's USER_CACHE_TTL (60 s) runs out
+        invalidate_user_cache(user_id)
         
         return {
             "success": True,
@@ -8,7 +8,7 @@ from typing import List, Optional
 import logging
 
 from backend.database.firestore_client import firestore_client
-from backend.routers.auth import get_current_user
+from backend.routers.auth import get_current_user, invalidate_user_cache
 
 logger = logging.getLogger(__name__)
 
@@ -59,25 +59,33 @@ async def get_profile(current_user: dict = Depends(get_current_user)):
     - Requires authentication
     """
     try:
+        # Read fresh: current_user can come from the auth cache, which is per
+        # process and may predate an update made on another instance
+        user = await firestore_client.get_user(current_user.get('userId'))
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        
         return {
-            "userId": current_user.get('userId'),
-            "email": current_user.get('email'),
-            "name": current_user.get('name') or current_user.get('full_name'),
-            "full_name": current_user.get('full_name'),
-            "skills": current_user.get('skills', []),
-            "interests": current_user.get('interests', []),
-            "experience": current_user.get('experience'),
-            "company": current_user.get('company'),
-            "website": current_user.get('website'),
-            "location": current_user.get('location'),
-            "headline": current_user.get('headline'),
-            "bio": current_user.get('bio'),
-            "photo": current_user.get('photo'),
-            "languages": current_user.get('languages', []),
-            "createdAt": str(current_user.get('createdAt')) if current_user.get('createdAt') else None,
-            "lastLogin": str(current_user.get('lastLogin')) if current_user.get('lastLogin') else None
+            "userId": user.get('userId'),
+            "email": user.get('email'),
+            "name": user.get('name') or user.get('full_name'),
+            "full_name": user.get('full_name'),
+            "skills": user.get('skills', []),
+            "interests": user.get('interests', []),
+            "experience": user.get('experience'),
+            "company": user.get('company'),
+            "website": user.get('website'),
+            "location": user.get('location'),
+            "headline": user.get('headline'),
+            "bio": user.get('bio'),
+            "photo": user.get('photo'),
+            "languages": user.get('languages', []),
+            "createdAt": str(user.get('createdAt')) if user.get('createdAt') else None,
+            "lastLogin": str(user.get('lastLogin')) if user.get('lastLogin') else None
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching profile: {e}")
         raise HTTPException(
@@ -101,31 +109,7 @@ async def update_profile(
         user_id = current_user.get('userId')
         
         # Prepare update data (exclude None values)
-        update_dict = {}
-        if update_data.name is not None:
-            update_dict['name'] = update_data.name
-        if update_data.full_name is not None:
-            update_dict['full_name'] = update_data.full_name
-        if update_data.skills is not None:
-            update_dict['skills'] = update_data.skills
-        if update_data.interests is not None:
-            update_dict['interests'] = update_data.interests
-        if update_data.experience is not None:
-            update_dict['experience'] = update_data.experience
-        if update_data.company is not None:
-            update_dict['company'] = update_data.company
-        if update_data.website is not None:
-            update_dict['website'] = update_data.website
-        if update_data.location is not None:
-            update_dict['location'] = update_data.location
-        if update_data.headline is not None:
-            update_dict['headline'] = update_data.headline
-        if update_data.bio is not None:
-            update_dict['bio'] = update_data.bio
-        if update_data.photo is not None:
-            update_dict['photo'] = update_data.photo
-        if update_data.languages is not None:
-            update_dict['languages'] = update_data.languages
+        update_dict = update_data.model_dump(exclude_none=True)
         
         if not update_dict:
             raise HTTPException(
@@ -135,6 +119,7 @@ async def update_profile(
         
         # Update in Firestore
         success = await firestore_client.update_user(user_id, update_dict)
+        invalidate_user_cache(user_id)
         
         if not success:
             raise HTTPException(
@@ -188,6 +173,7 @@ async def delete_account(current_user: dict = Depends(get_current_user)):
         
         # Mark user as inactive
         await firestore_client.update_user(user_id, {'is_active': False})
+        invalidate_user_cache(user_id)
         
         logger.info(f"Account deleted for user {user_id}")
         
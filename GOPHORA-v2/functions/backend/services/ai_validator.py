@@ -4,12 +4,14 @@ Validates job relevance against user profiles
 Supports multiple AI providers for redundancy
 """
 import os
+import re
 import google.generativeai as genai
-from openai import OpenAI
+from openai import AsyncOpenAI
 from typing import Dict, Any, List
 from dotenv import load_dotenv
 import logging
-import json
+import orjson
+from cachetools import LRUCache
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -20,10 +22,66 @@ if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
 
 GEMINI_MODEL = os.getenv("GEMINI_CHAT_MODEL", "gemini-1.5-flash-latest")
+gemini_model = genai.GenerativeModel(GEMINI_MODEL) if GEMINI_API_KEY else None
+
+# First number in a model reply, e.g. "85", "85.5" or "Relevance: 85/100"
+_SCORE_RE = re.compile(r"\d+(?:\.\d+)?")
 
 # Configure OpenAI API
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-openai_client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+
+# Prompt templates, built once and filled with str.format per call
+VALIDATION_PROMPT = """
+You are an expert career advisor and job matching AI. Analyze if this job is relevant for the candidate.
+
+**Candidate Profile:**
+- Skills: {skills}
+- Interests: {interests}
+- Experience Level: {experience}
+
+**Job Details:**
+- Title: {job_title}
+- Description: {job_description}
+- Requirements: {job_requirements}
+
+**Task:**
+Provide a detailed analysis in JSON format with:
+1. relevance_score (0-100): How well this job matches the candidate
+2. reasoning: Brief explanation of the score
+3. is_relevant: true if score >= 40, false otherwise
+4. skill_matches: List of candidate skills that match job requirements
+5. skill_gaps: List of required skills the candidate lacks
+
+**Scoring Guidelines:**
+- 90-100: Perfect match, candidate highly qualified
+- 70-89: Good match, candidate qualified with minor gaps
+- 50-69: Moderate match, candidate could apply
+- 40-49: Acceptable match, candidate can learn on the job
+- 0-39: Poor match, not recommended
+
+Return ONLY valid JSON, no additional text.
+"""
+
+CATEGORY_PROMPT = """
+Categorize this job into ONE of these categories:
+- Technology & IT
+- Creative & Design
+- Data Entry & Admin
+- Customer Service
+- Sales & Marketing
+- Writing & Content
+- Education & Training
+- Healthcare
+- Finance & Accounting
+- Freelance & Gig
+- Other
+
+Job Title: {job_title}
+Job Description: {job_description}
+
+Return ONLY the category name, nothing else.
+"""
 
 class AIValidator:
     """AI-powered job validation using Gemini and OpenAI"""
@@ -31,6 +89,8 @@ class AIValidator:
     def __init__(self):
         self.use_openai = bool(openai_client)
         self.use_gemini = bool(GEMINI_API_KEY)
+        # Scrapers re-see the same postings every run; remember their categories
+        self._category_cache = LRUCache(maxsize=10000)
         logger.info(f"AI Validator initialized - OpenAI: {self.use_openai}, Gemini: {self.use_gemini}")
     
     async def _call_openai(self, prompt: str, response_format: str = "json") -> str:
@@ -39,7 +99,7 @@ class AIValidator:
             if not openai_client:
                 raise Exception("OpenAI not configured")
             
-            response = openai_client.chat.completions.create(
+            response = await openai_client.chat.completions.create(
                 model="gpt-4-turbo-preview",
                 messages=[
                     {"role": "system", "content": "You are an expert career advisor and job matching AI. Always respond in valid JSON format."},
@@ -58,8 +118,10 @@ class AIValidator:
     async def _call_gemini(self, prompt: str) -> str:
         """Call Google Gemini API"""
         try:
-            model = genai.GenerativeModel(GEMINI_MODEL)
-            response = model.generate_content(prompt)
+            if not gemini_model:
+                raise Exception("Gemini not configured")
+            
+            response = await gemini_model.generate_content_async(prompt)
             return response.text.strip()
         except Exception as e:
             logger.error(f"Gemini API error: {e}")
@@ -88,46 +150,24 @@ class AIValidator:
         """
         try:
             # Construct validation prompt
-            prompt = f"""
-You are an expert career advisor and job matching AI. Analyze if this job is relevant for the candidate.
-
-**Candidate Profile:**
-- Skills: {', '.join(user_skills) if user_skills else 'Not specified'}
-- Interests: {', '.join(user_interests) if user_interests else 'Not specified'}
-- Experience Level: {user_experience if user_experience else 'Not specified'}
-
-**Job Details:**
-- Title: {job_title}
-- Description: {job_description}
-- Requirements: {job_requirements}
-
-**Task:**
-Provide a detailed analysis in JSON format with:
-1. relevance_score (0-100): How well this job matches the candidate
-2. reasoning: Brief explanation of the score
-3. is_relevant: true if score >= 40, false otherwise
-4. skill_matches: List of candidate skills that match job requirements
-5. skill_gaps: List of required skills the candidate lacks
-
-**Scoring Guidelines:**
-- 90-100: Perfect match, candidate highly qualified
-- 70-89: Good match, candidate qualified with minor gaps
-- 50-69: Moderate match, candidate could apply
-- 40-49: Acceptable match, candidate can learn on the job
-- 0-39: Poor match, not recommended
-
-Return ONLY valid JSON, no additional text.
-"""
+            prompt = VALIDATION_PROMPT.format(
+                skills=', '.join(user_skills) if user_skills else 'Not specified',
+                interests=', '.join(user_interests) if user_interests else 'Not specified',
+                experience=user_experience if user_experience else 'Not specified',
+                job_title=job_title,
+                job_description=job_description,
+                job_requirements=job_requirements
+            )
             
             # Try OpenAI first (GPT-4), fallback to Gemini
             response_text = ""
             try:
                 if self.use_openai:
                     response_text = await self._call_openai(prompt)
-                    logger.info("Used OpenAI GPT-4 for validation")
+                    logger.debug("Used OpenAI GPT-4 for validation")
                 elif self.use_gemini:
                     response_text = await self._call_gemini(prompt)
-                    logger.info("Used Google Gemini for validation")
+                    logger.debug("Used Google Gemini for validation")
                 else:
                     raise Exception("No AI provider configured")
             except Exception as e:
@@ -135,10 +175,10 @@ Return ONLY valid JSON, no additional text.
                 logger.warning(f"Primary AI failed: {e}, trying fallback...")
                 if self.use_gemini and not response_text:
                     response_text = await self._call_gemini(prompt)
-                    logger.info("Used Gemini as fallback")
+                    logger.debug("Used Gemini as fallback")
                 elif self.use_openai and not response_text:
                     response_text = await self._call_openai(prompt)
-                    logger.info("Used OpenAI as fallback")
+                    logger.debug("Used OpenAI as fallback")
                 else:
                     raise
             
@@ -152,7 +192,7 @@ Return ONLY valid JSON, no additional text.
                 json_end = response_text.find("```", json_start)
                 response_text = response_text[json_start:json_end].strip()
             
-            validation_result = json.loads(response_text)
+            validation_result = orjson.loads(response_text)
             
             # Ensure all required fields exist
             default_result = {
@@ -165,7 +205,7 @@ Return ONLY valid JSON, no additional text.
             
             return {**default_result, **validation_result}
             
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"JSON parse error in AI validation: {e}\nResponse: {response_text}")
             return {
                 'relevance_score': 0,
@@ -205,8 +245,10 @@ Provide ONLY a number from 0-100 representing relevance percentage.
                 response_text = await self._call_gemini(prompt)
             
             # Extract number from response
-            score_text = response_text.strip()
-            score = float(''.join(filter(str.isdigit, score_text)))
+            match = _SCORE_RE.search(response_text)
+            if not match:
+                return 0.0
+            score = float(match.group())
             return min(100, max(0, score))
             
         except Exception as e:
@@ -218,26 +260,17 @@ Provide ONLY a number from 0-100 representing relevance percentage.
         Categorize job into predefined categories
         Returns category name
         """
+        # Only the first 300 chars of the description reach the prompt
+        cache_key = (
+            " ".join(job_title.lower().split()),
+            " ".join(job_description[:300].lower().split())
+        )
+        cached = self._category_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            prompt = f"""
-Categorize this job into ONE of these categories:
-- Technology & IT
-- Creative & Design
-- Data Entry & Admin
-- Customer Service
-- Sales & Marketing
-- Writing & Content
-- Education & Training
-- Healthcare
-- Finance & Accounting
-- Freelance & Gig
-- Other
-
-Job Title: {job_title}
-Job Description: {job_description[:300]}
-
-Return ONLY the category name, nothing else.
-"""
+            prompt = CATEGORY_PROMPT.format(job_title=job_title, job_description=job_description[:300])
             
             response_text = ""
             if self.use_openai:
@@ -246,6 +279,8 @@ Return ONLY the category name, nothing else.
                 response_text = await self._call_gemini(prompt)
             
             category = response_text.strip()
+            if category:
+                self._category_cache[cache_key] = category
             return category
             
         except Exception as e:
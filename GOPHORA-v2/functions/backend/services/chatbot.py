@@ -4,8 +4,12 @@ Built with LangChain + Google Gemini API
 Features: General Q&A, Job Recommendations, RAG with embeddings, Conversational Memory
 """
 import os
+import re
+import heapq
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+from collections import deque
+from typing import List, Dict, Any, Optional, AsyncIterator
 import google.generativeai as genai
 from dotenv import load_dotenv
 
@@ -14,7 +18,7 @@ from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmb
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_core.prompts import PromptTemplate, ChatPromptTemplate, MessagesPlaceholder
 
-from backend.database.firestore_client import firestore_client
+from backend.database.firestore_client import firestore_client, build_search_text
 from backend.utils.embeddings import embeddings_handler
 
 load_dotenv()
@@ -27,6 +31,20 @@ GEMINI_MODEL = os.getenv("GEMINI_CHAT_MODEL", "gemini-1.5-flash-latest")
 if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
 
+# Keywords that route a message to job search
+JOB_KEYWORDS = (
+    'job', 'jobs', 'work', 'career', 'position', 'hiring', 'opportunity',
+    'developer', 'engineer', 'designer', 'manager', 'analyst', 'intern',
+    'remote', 'freelance', 'part-time', 'full-time', 'gig',
+    'java', 'python', 'react', 'data', 'marketing', 'sales'
+)
+
+# Messages of recent history included in a Q&A prompt
+HISTORY_WINDOW = 5
+
+# Compiled once: a single scan of the message instead of one per keyword
+_JOB_KEYWORD_RE = re.compile('|'.join(re.escape(keyword) for keyword in JOB_KEYWORDS))
+
 class GophoraAI:
     """Enhanced AI chatbot with LangChain integration"""
     
@@ -47,26 +65,27 @@ class GophoraAI:
                 google_api_key=GEMINI_API_KEY
             )
             
-            # Conversation history (simple dict-based storage per user)
+            # Conversation history per user, capped at what the prompt actually uses
             self.conversations = {}
             
+            # Strong references to in-flight history writes so they aren't GC'd
+            self._pending_writes = set()
+            
             logger.info("GophoraAI chatbot initialized successfully")
             
         except Exception as e:
             logger.error(f"Error initializing GophoraAI: {e}")
             raise
     
-    def _get_conversation_history(self, user_id: str) -> List[Dict]:
+    def _get_conversation_history(self, user_id: str) -> deque:
         """Get conversation history for a user"""
         if user_id not in self.conversations:
-            self.conversations[user_id] = []
+            self.conversations[user_id] = deque(maxlen=HISTORY_WINDOW)
         return self.conversations[user_id]
     
     def _add_to_history(self, user_id: str, role: str, content: str):
-        """Add message to conversation history"""
-        if user_id not in self.conversations:
-            self.conversations[user_id] = []
-        self.conversations[user_id].append({"role": role, "content": content})
+        """Add message to conversation history (oldest messages fall off)"""
+        self._get_conversation_history(user_id).append({"role": role, "content": content})
     
     async def detect_intent(self, message: str) -> str:
         """
@@ -76,18 +95,9 @@ class GophoraAI:
             message_lower = message.lower()
             
             # Simple keyword detection - faster and more reliable
-            job_keywords = [
-                'job', 'jobs', 'work', 'career', 'position', 'hiring', 'opportunity',
-                'developer', 'engineer', 'designer', 'manager', 'analyst', 'intern',
-                'remote', 'freelance', 'part-time', 'full-time', 'gig',
-                'java', 'python', 'react', 'data', 'marketing', 'sales'
-            ]
-            
-            # Check if any job keyword is in the message
-            for keyword in job_keywords:
-                if keyword in message_lower:
-                    logger.info(f"Detected job_search intent for: {message}")
-                    return 'job_search'
+            if _JOB_KEYWORD_RE.search(message_lower):
+                logger.info(f"Detected job_search intent for: {message}")
+                return 'job_search'
             
             # Default to general Q&A
             logger.info(f"Detected general_qa intent for: {message}")
@@ -109,22 +119,28 @@ class GophoraAI:
         """
         try:
             query_lower = query.lower()
+            query_words = query_lower.split()
+            
+            if not query_words:
+                return []
             
-            # Get user's personalized jobs
-            try:
-                personalized_jobs = await firestore_client.get_personalized_jobs(
+            # Fetch the user's personalized jobs and general jobs concurrently
+            personalized_jobs, general_jobs = await asyncio.gather(
+                firestore_client.get_personalized_jobs(
                     user_id, 
                     limit=50, 
                     active_only=True
-                )
-            except Exception:
-                personalized_jobs = []
-            
-            # Get general jobs
-            general_jobs = await firestore_client.get_general_jobs(
-                limit=50,
-                active_only=True
+                ),
+                firestore_client.get_general_jobs(
+                    limit=50,
+                    active_only=True
+                ),
+                return_exceptions=True
             )
+            if isinstance(personalized_jobs, Exception):
+                personalized_jobs = []
+            if isinstance(general_jobs, Exception):
+                raise general_jobs
             
             # Combine all jobs
             all_jobs = personalized_jobs + general_jobs
@@ -132,10 +148,10 @@ class GophoraAI:
             # Filter jobs by keyword matching
             matching_jobs = []
             for job in all_jobs:
-                job_text = f"{job.get('jobTitle', '')} {job.get('description', '')} {job.get('category', '')} {job.get('company', '')} {job.get('source', '')}".lower()
+                # searchText is stored lowercased at write time; build it for older docs
+                job_text = job.get('searchText') or build_search_text(job)
                 
                 # Check if query keywords appear in job text
-                query_words = query_lower.split()
                 matches = sum(1 for word in query_words if word in job_text)
                 
                 if matches > 0:
@@ -143,11 +159,12 @@ class GophoraAI:
                     job['relevance_score'] = matches
                     matching_jobs.append(job)
             
-            # Sort by relevance score
-            matching_jobs.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
+            # Return top results by relevance score (partial sort, same order as a full one)
+            top_jobs = heapq.nlargest(limit, matching_jobs, key=lambda x: x.get('relevance_score', 0))
             
-            # Return top results
-            top_jobs = matching_jobs[:limit]
+            # searchText is an index field, not something the client should receive
+            for job in top_jobs:
+                job.pop('searchText', None)
             
             logger.info(f"Keyword search returned {len(top_jobs)} jobs for query: {query}")
             return top_jobs
@@ -183,14 +200,12 @@ class GophoraAI:
                 'opportunities': []
             }
     
-    async def handle_general_qa(self, user_id: str, message: str) -> Dict[str, Any]:
-        """Handle general Q&A - answer ANY question like ChatGPT"""
-        try:
-            # Get conversation history
-            history = self._get_conversation_history(user_id)
-            
-            # Simple direct prompt - let Gemini answer anything
-            system_message = """
+    def _build_qa_prompt(self, user_id: str, message: str) -> str:
+        """Build the general Q&A prompt from the system message and recent history"""
+        history = self._get_conversation_history(user_id)
+        
+        # Simple direct prompt - let Gemini answer anything
+        system_message = """
 You are a helpful AI assistant. Answer ANY question the user asks - whether it's about:
 - Geography, history, science, technology
 - Programming, math, general knowledge  
@@ -201,29 +216,35 @@ If asked about Gophora specifically, explain that it's an AI-powered job aggrega
 
 Answer naturally like ChatGPT or Gemini would.
 """
-            
-            # Build conversation context
-            conversation_context = system_message + "\n\nConversation:\n"
-            for msg in history[-5:]:  # Last 5 messages
-                conversation_context += f"{msg['role']}: {msg['content']}\n"
-            conversation_context += f"user: {message}\nassistant:"
+        
+        # Build conversation context from the last HISTORY_WINDOW messages in one join
+        lines = [system_message, "\nConversation:"]
+        lines.extend(f"{msg['role']}: {msg['content']}" for msg in history)
+        lines.append(f"user: {message}\nassistant:")
+        return "\n".join(lines)
+    
+    def _record_exchange(self, user_id: str, message: str, response: str):
+        """Add an exchange to memory and persist it in the background"""
+        self._add_to_history(user_id, 'user', message)
+        self._add_to_history(user_id, 'assistant', response)
+        
+        # Save to Firestore in the background; the reply doesn't depend on it
+        task = asyncio.create_task(firestore_client.add_chat_messages(user_id, [
+            {'role': 'user', 'content': message},
+            {'role': 'assistant', 'content': response}
+        ]))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+    
+    async def handle_general_qa(self, user_id: str, message: str) -> Dict[str, Any]:
+        """Handle general Q&A - answer ANY question like ChatGPT"""
+        try:
+            conversation_context = self._build_qa_prompt(user_id, message)
             
             response_obj = await self.llm.ainvoke(conversation_context)
             response = response_obj.content if hasattr(response_obj, 'content') else str(response_obj)
             
-            # Add to history
-            self._add_to_history(user_id, 'user', message)
-            self._add_to_history(user_id, 'assistant', response)
-            
-            # Save to Firestore
-            await firestore_client.add_chat_message(user_id, {
-                'role': 'user',
-                'content': message
-            })
-            await firestore_client.add_chat_message(user_id, {
-                'role': 'assistant',
-                'content': response
-            })
+            self._record_exchange(user_id, message, response)
             
             return {
                 'reply': response,
@@ -237,6 +258,19 @@ Answer naturally like ChatGPT or Gemini would.
                 'opportunities': None
             }
     
+    async def stream_general_qa(self, user_id: str, message: str) -> AsyncIterator[str]:
+        """Stream a general Q&A answer chunk by chunk"""
+        conversation_context = self._build_qa_prompt(user_id, message)
+        
+        parts = []
+        async for chunk in self.llm.astream(conversation_context):
+            text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+            if text:
+                parts.append(text)
+                yield text
+        
+        self._record_exchange(user_id, message, "".join(parts))
+    
     async def chat(self, user_id: str, message: str) -> Dict[str, Any]:
         """
         Main chat method - routes to appropriate handler based on intent
@@ -266,8 +300,7 @@ Answer naturally like ChatGPT or Gemini would.
     
     def clear_user_memory(self, user_id: str):
         """Clear conversation memory for a user"""
-        if user_id in self.memories:
-            del self.memories[user_id]
+        if self.conversations.pop(user_id, None) is not None:
             logger.info(f"Cleared memory for user {user_id}")
 
 # Global instance
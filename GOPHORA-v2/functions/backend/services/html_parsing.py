@@ -0,0 +1,58 @@
+"""
+HTML parsing for scraped listing pages
+Runs in the scraper's worker processes, so it imports only the parser
+libraries and none of the app's services (no Firebase, Selenium or AI clients)
+"""
+import logging
+from typing import List, Dict, Any
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+# Only job cards are read from an Indeed results page; skip building the rest of the tree
+_INDEED_CARDS = SoupStrainer(['div', 'td'], class_=['job_seen_beacon', 'resultContent'])
+
+
+def parse_indeed_page(html: bytes, location: str, limit: int) -> List[Dict[str, Any]]:
+    """Parse Indeed search results HTML into job dicts (runs in a worker process)"""
+    jobs = []
+    soup = BeautifulSoup(html, 'lxml', parse_only=_INDEED_CARDS)
+    
+    # Find job cards (Indeed's structure may change, adjust selectors as needed)
+    job_cards = soup.find_all('div', class_='job_seen_beacon') or soup.find_all('td', class_='resultContent')
+    
+    for card in job_cards[:limit]:
+        try:
+            # Extract job details
+            title_elem = card.find('h2', class_='jobTitle') or card.find('a', class_='jcs-JobTitle')
+            company_elem = card.find('span', class_='companyName')
+            location_elem = card.find('div', class_='companyLocation')
+            summary_elem = card.find('div', class_='job-snippet')
+            link_elem = title_elem.find('a') if title_elem else None
+            
+            if not title_elem:
+                continue
+            
+            job_title = title_elem.get_text(strip=True) if title_elem else "Unknown"
+            company = company_elem.get_text(strip=True) if company_elem else "Unknown"
+            job_location = location_elem.get_text(strip=True) if location_elem else location
+            description = summary_elem.get_text(strip=True) if summary_elem else ""
+            job_link = "https://www.indeed.com" + link_elem['href'] if link_elem and link_elem.get('href') else ""
+            
+            jobs.append({
+                'jobTitle': job_title,
+                'company': company,
+                'location': job_location,
+                'description': description,
+                'requirements': '',  # Indeed doesn't always show requirements in listings
+                'salary': '',
+                'sourceLink': job_link,
+                'source': 'Indeed'
+            })
+        
+        except Exception as e:
+            logger.warning(f"Error parsing Indeed job card: {e}")
+            continue
+    
+    return jobs
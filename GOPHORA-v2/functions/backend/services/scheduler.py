@@ -54,10 +54,11 @@ class ScraperScheduler:
             results = await personalized_scraper.scrape_jobs_for_all_users()
             
             # Update stats
-            self.last_personalized_run = datetime.now()
+            finished_at = datetime.now()
+            self.last_personalized_run = finished_at
             self.personalized_job_count = sum(results.values())
             
-            duration = (datetime.now() - start_time).total_seconds()
+            duration = (finished_at - start_time).total_seconds()
             logger.info(
                 f"Personalized scraper completed in {duration:.2f}s. "
                 f"Added {self.personalized_job_count} jobs across {len(results)} users"
@@ -77,10 +78,11 @@ class ScraperScheduler:
             count = await general_scraper.scrape_all_general_jobs()
             
             # Update stats
-            self.last_general_run = datetime.now()
+            finished_at = datetime.now()
+            self.last_general_run = finished_at
             self.general_job_count = count
             
-            duration = (datetime.now() - start_time).total_seconds()
+            duration = (finished_at - start_time).total_seconds()
             logger.info(
                 f"General scraper completed in {duration:.2f}s. "
                 f"Added {count} jobs"
@@ -102,9 +104,10 @@ class ScraperScheduler:
             # Cleanup general jobs
             general_count = await firestore_client.deactivate_old_general_jobs(days=7)
             
-            self.last_cleanup_run = datetime.now()
+            finished_at = datetime.now()
+            self.last_cleanup_run = finished_at
             
-            duration = (datetime.now() - start_time).total_seconds()
+            duration = (finished_at - start_time).total_seconds()
             logger.info(
                 f"Cleanup completed in {duration:.2f}s. "
                 f"Deactivated {personalized_count} personalized jobs and {general_count} general jobs"
@@ -55,6 +55,11 @@ class GeneralJobScraper:
     
     async def scrape_upwork_gigs(self, limit: int = 15) -> List[Dict[str, Any]]:
         """Scrape real Upwork gig opportunities"""
+        # Selenium blocks, so drive the browser on a worker thread
+        return await asyncio.to_thread(self._scrape_upwork_gigs_sync, limit)
+    
+    def _scrape_upwork_gigs_sync(self, limit: int) -> List[Dict[str, Any]]:
+        """Blocking Selenium scrape of Upwork gigs"""
         jobs = []
         driver = None
         
@@ -72,7 +77,7 @@ class GeneralJobScraper:
             self._random_delay(2, 3)
             
             # Parse with BeautifulSoup
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            soup = BeautifulSoup(driver.page_source, 'lxml')
             
             # Find job cards
             job_cards = soup.find_all('article', class_='job-tile')[:limit]
@@ -81,7 +86,7 @@ class GeneralJobScraper:
                 try:
                     title_elem = card.find('h2', class_='h4') or card.find('h3')
                     description_elem = card.find('p', class_='text-body-sm')
-                    budget_elem = card.find('strong', text=lambda t: '$' in str(t) if t else False)
+                    budget_elem = card.find('strong', string=lambda s: s and '$' in s)
                     link_elem = card.find('a', href=True)
                     
                     if not title_elem:
@@ -171,7 +176,7 @@ class GeneralJobScraper:
                 url = f"https://www.fiverr.com/categories/{category}"
                 
                 response = self.session.get(url, timeout=10)
-                soup = BeautifulSoup(response.content, 'html.parser')
+                soup = BeautifulSoup(response.content, 'lxml')
                 
                 # Simplified - Fiverr structure is complex
                 gig_cards = soup.find_all('div', class_='gig-card-layout')
@@ -294,33 +299,31 @@ class GeneralJobScraper:
         Returns count of new jobs added
         """
         try:
-            all_jobs = []
-            
-            # Get opportunities from various sources
-            logger.info("Starting Upwork scraping...")
-            upwork_jobs = await self.scrape_upwork_gigs(limit=15)
-            all_jobs.extend(upwork_jobs)
-            self._random_delay(3, 5)
+            # Get opportunities from all sources concurrently
+            logger.info("Scraping Upwork, MTurk and survey sites...")
+            upwork_jobs, mturk_jobs, survey_jobs = await asyncio.gather(
+                self.scrape_upwork_gigs(limit=15),
+                self.scrape_mturk_hits(limit=10),
+                self.scrape_survey_sites()
+            )
+            all_jobs = upwork_jobs + mturk_jobs + survey_jobs
             
-            logger.info("Adding MTurk opportunities...")
-            mturk_jobs = await self.scrape_mturk_hits(limit=10)
-            all_jobs.extend(mturk_jobs)
-            
-            logger.info("Adding survey sites...")
-            survey_jobs = await self.scrape_survey_sites()
-            all_jobs.extend(survey_jobs)
+            if not all_jobs:
+                logger.info("No general jobs scraped, nothing to store")
+                return 0
             
             # Store jobs in Firestore with AI validation
             new_jobs_count = 0
-            
+            new_jobs = []
+
+            # Look up already-stored sourceLinks in one pass instead of one query per job
+            existing_links = await firestore_client.get_existing_general_job_links(
+                [job['sourceLink'] for job in all_jobs]
+            )
+
             for job in all_jobs:
                 # Check for duplicates by sourceLink
-                is_duplicate = await firestore_client.check_duplicate_general_job(
-                    job['jobTitle'],
-                    job['sourceLink']
-                )
-                
-                if is_duplicate:
+                if job['sourceLink'] in existing_links:
                     logger.debug(f"Skipping duplicate job: {job['jobTitle']}")
                     continue
                 
@@ -342,13 +345,12 @@ class GeneralJobScraper:
                 job.setdefault('requirements', 'No experience required')
                 job.setdefault('salary', job.get('estimatedPay', 'Varies'))
                 
-                # Store in Firestore
-                try:
-                    await firestore_client.add_general_job(job)
-                    new_jobs_count += 1
-                    logger.info(f"✅ Added general job: {job['jobTitle']} ({job['source']})")
-                except Exception as e:
-                    logger.error(f"Failed to store job {job['jobTitle']}: {e}")
+                existing_links.add(job['sourceLink'])
+                new_jobs.append(job)
+            
+            # Store in Firestore, up to 500 jobs per batched write
+            if new_jobs:
+                new_jobs_count = await firestore_client.add_general_jobs(new_jobs)
             
             logger.info(f"🎉 General job scraping complete. Added {new_jobs_count} new jobs out of {len(all_jobs)} total")
             return new_jobs_count
@@ -3,16 +3,22 @@ Personalized Job Scraper
 Scrapes job opportunities from LinkedIn, Indeed, Glassdoor, and company career pages
 Uses BeautifulSoup, Scrapy, and Selenium for comprehensive coverage
 """
+import os
 import asyncio
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 import random
 import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlencode, quote
 
 # Web scraping imports
-import requests
+import httpx
 from bs4 import BeautifulSoup
+from cachetools import TTLCache
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -25,23 +31,93 @@ from fake_useragent import UserAgent
 # Internal imports
 from backend.database.firestore_client import firestore_client
 from backend.services.ai_validator import ai_validator
+from backend.services.html_parsing import parse_indeed_page
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Max AI validation calls in flight per user scrape
+AI_VALIDATION_CONCURRENCY = 5
+
+# Skip the AI call for jobs that mention none of the user's skills or interests.
+# Off by default: a literal substring match misses synonyms and abbreviations
+# ("JS" vs "JavaScript"), so enabling it trades recall for fewer AI calls
+AI_PREFILTER_ENABLED = os.getenv("AI_PREFILTER_ENABLED", "false").lower() == "true"
+
+# How long a fetched listing page's validators and parsed jobs are kept for revalidation
+HTTP_CACHE_TTL = 3600
+
+# Worker processes for CPU-bound HTML parsing (started on first use)
+PARSE_WORKERS = min(4, os.cpu_count() or 1)
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_parse_pool() -> ProcessPoolExecutor:
+    """Lazily start the shared HTML parsing process pool"""
+    global _parse_pool
+    if _parse_pool is None:
+        # spawn, not fork: the app process already runs gRPC (Firestore) threads,
+        # and forking a multithreaded process can deadlock the child
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=PARSE_WORKERS,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _parse_pool
+
+
+async def _parse_in_pool(fn, *args):
+    """Run a parser in the process pool, replacing the pool once if a worker died"""
+    global _parse_pool
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_parse_pool(), fn, *args)
+    except BrokenProcessPool:
+        # A crashed worker (OOM, lxml segfault) breaks the pool for good; start a fresh one
+        logger.warning("HTML parsing pool broke, restarting it")
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False)
+        _parse_pool = None
+        return await loop.run_in_executor(_get_parse_pool(), fn, *args)
+
+
 class PersonalizedJobScraper:
     """Scrapes personalized jobs for users based on their profiles"""
     
     def __init__(self):
         self.ua = UserAgent()
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': self.ua.random,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-        })
+        # Shared async client: pooled keep-alive connections, no event-loop blocking
+        self.http_client = httpx.AsyncClient(
+            headers={
+                'User-Agent': self.ua.random,
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'en-US,en;q=0.5',
+                'Accept-Encoding': 'gzip, deflate',
+            },
+            timeout=10,
+            follow_redirects=True,
+            http2=True
+        )
+        # Search URL -> (ETag, Last-Modified, parsed jobs); users with the same
+        # skills hit the same search pages, so repeats can come back as 304s
+        self._listing_cache = TTLCache(maxsize=512, ttl=HTTP_CACHE_TTL)
+        # One headless Chrome at a time: each takes hundreds of MB, on top of
+        # the parse pool, in a memory-capped function (created on first use)
+        self._selenium_slot: Optional[asyncio.Semaphore] = None
+    
+    async def _one_browser_at_a_time(self, scrape):
+        """Run a Selenium scrape once no other headless Chrome is running"""
+        if self._selenium_slot is None:
+            self._selenium_slot = asyncio.Semaphore(1)
+        async with self._selenium_slot:
+            return await scrape
+    
+    async def aclose(self):
+        """Close the shared HTTP client and parsing pool"""
+        global _parse_pool
+        await self.http_client.aclose()
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False, cancel_futures=True)
+            _parse_pool = None
     
     def _get_selenium_driver(self):
         """Initialize Selenium WebDriver with anti-detection settings"""
@@ -63,9 +139,13 @@ class PersonalizedJobScraper:
         return driver
     
     def _random_delay(self, min_seconds: float = 1.0, max_seconds: float = 3.0):
-        """Add random delay to mimic human behavior"""
+        """Add random delay to mimic human behavior (Selenium worker threads only)"""
         time.sleep(random.uniform(min_seconds, max_seconds))
     
+    async def _async_delay(self, min_seconds: float = 1.0, max_seconds: float = 3.0):
+        """Random delay for coroutines; yields the event loop instead of blocking it"""
+        await asyncio.sleep(random.uniform(min_seconds, max_seconds))
+    
     async def scrape_indeed(self, keywords: str, location: str = "", limit: int = 10) -> List[Dict[str, Any]]:
         """Scrape jobs from Indeed"""
         jobs = []
@@ -78,46 +158,31 @@ class PersonalizedJobScraper:
                 'limit': limit
             }
             
-            response = self.session.get(base_url, params=params, timeout=10)
+            url = str(httpx.URL(base_url, params=params))
+            cached = self._listing_cache.get(url)
+            
+            # Revalidate a previously seen page instead of downloading and parsing it again
+            headers = {}
+            if cached:
+                etag, last_modified, _ = cached
+                if etag:
+                    headers['If-None-Match'] = etag
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
+            
+            response = await self.http_client.get(url, headers=headers)
+            if response.status_code == 304 and cached:
+                logger.info(f"Indeed page unchanged, reusing {len(cached[2])} cached jobs")
+                return [dict(job) for job in cached[2][:limit]]
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find job cards (Indeed's structure may change, adjust selectors as needed)
-            job_cards = soup.find_all('div', class_='job_seen_beacon') or soup.find_all('td', class_='resultContent')
+            # Parse in a worker process so CPU-bound parsing doesn't hold up the event loop
+            jobs = await _parse_in_pool(parse_indeed_page, response.content, location, limit)
             
-            for card in job_cards[:limit]:
-                try:
-                    # Extract job details
-                    title_elem = card.find('h2', class_='jobTitle') or card.find('a', class_='jcs-JobTitle')
-                    company_elem = card.find('span', class_='companyName')
-                    location_elem = card.find('div', class_='companyLocation')
-                    summary_elem = card.find('div', class_='job-snippet')
-                    link_elem = title_elem.find('a') if title_elem else None
-                    
-                    if not title_elem:
-                        continue
-                    
-                    job_title = title_elem.get_text(strip=True) if title_elem else "Unknown"
-                    company = company_elem.get_text(strip=True) if company_elem else "Unknown"
-                    job_location = location_elem.get_text(strip=True) if location_elem else location
-                    description = summary_elem.get_text(strip=True) if summary_elem else ""
-                    job_link = "https://www.indeed.com" + link_elem['href'] if link_elem and link_elem.get('href') else ""
-                    
-                    jobs.append({
-                        'jobTitle': job_title,
-                        'company': company,
-                        'location': job_location,
-                        'description': description,
-                        'requirements': '',  # Indeed doesn't always show requirements in listings
-                        'salary': '',
-                        'sourceLink': job_link,
-                        'source': 'Indeed'
-                    })
-                    
-                except Exception as e:
-                    logger.warning(f"Error parsing Indeed job card: {e}")
-                    continue
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if etag or last_modified:
+                self._listing_cache[url] = (etag, last_modified, [dict(job) for job in jobs])
             
             logger.info(f"Scraped {len(jobs)} jobs from Indeed")
             
@@ -131,6 +196,11 @@ class PersonalizedJobScraper:
         Scrape jobs from LinkedIn using Selenium + BeautifulSoup
         Implements aggressive scrolling and pagination for 100+ jobs
         """
+        # Selenium blocks, so drive the browser on a worker thread
+        return await asyncio.to_thread(self._scrape_linkedin_sync, keywords, location, limit)
+    
+    def _scrape_linkedin_sync(self, keywords: str, location: str, limit: int) -> List[Dict[str, Any]]:
+        """Blocking Selenium scrape of LinkedIn"""
         jobs = []
         driver = None
         
@@ -138,8 +208,11 @@ class PersonalizedJobScraper:
             driver = self._get_selenium_driver()
             
             # Build LinkedIn jobs URL (public search, no login required)
-            keywords_encoded = keywords.replace(' ', '%20')
-            search_url = f"https://www.linkedin.com/jobs/search/?keywords={keywords_encoded}&location={location}&f_TPR=r86400&start=0"
+            query = urlencode(
+                {'keywords': keywords, 'location': location, 'f_TPR': 'r86400', 'start': 0},
+                quote_via=quote
+            )
+            search_url = f"https://www.linkedin.com/jobs/search/?{query}"
             
             driver.get(search_url)
             self._random_delay(3, 5)
@@ -160,9 +233,8 @@ class PersonalizedJobScraper:
                 except:
                     pass
                 
-                # Check current job count
-                soup = BeautifulSoup(driver.page_source, 'html.parser')
-                current_jobs = len(soup.find_all('div', class_='base-card'))
+                # Count cards in the live DOM rather than re-parsing the whole page each scroll
+                current_jobs = len(driver.find_elements(By.CSS_SELECTOR, 'div.base-card'))
                 logger.info(f"LinkedIn: Scroll {scroll_num + 1}/20, loaded {current_jobs} jobs so far")
                 
                 if current_jobs >= limit:
@@ -170,7 +242,7 @@ class PersonalizedJobScraper:
                     break
             
             # Get final page source and parse with BeautifulSoup
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            soup = BeautifulSoup(driver.page_source, 'lxml')
             
             # Find ALL job cards (no limit here, we'll take first 'limit' later)
             job_cards = soup.find_all('div', class_='base-card')
@@ -225,6 +297,11 @@ class PersonalizedJobScraper:
     
     async def scrape_glassdoor(self, keywords: str, location: str = "", limit: int = 10) -> List[Dict[str, Any]]:
         """Scrape jobs from Glassdoor"""
+        # Selenium blocks, so drive the browser on a worker thread
+        return await asyncio.to_thread(self._scrape_glassdoor_sync, keywords, location, limit)
+    
+    def _scrape_glassdoor_sync(self, keywords: str, location: str, limit: int) -> List[Dict[str, Any]]:
+        """Blocking Selenium scrape of Glassdoor"""
         jobs = []
         driver = None
         
@@ -232,14 +309,14 @@ class PersonalizedJobScraper:
             driver = self._get_selenium_driver()
             
             # Build Glassdoor search URL
-            keywords_encoded = keywords.replace(' ', '-')
-            search_url = f"https://www.glassdoor.com/Job/jobs.htm?sc.keyword={keywords_encoded}"
+            query = urlencode({'sc.keyword': keywords}, quote_via=quote)
+            search_url = f"https://www.glassdoor.com/Job/jobs.htm?{query}"
             
             driver.get(search_url)
             self._random_delay(3, 5)
             
             # Parse with BeautifulSoup
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            soup = BeautifulSoup(driver.page_source, 'lxml')
             
             # Find job cards (Glassdoor uses different selectors)
             job_cards = soup.find_all('li', class_='react-job-listing')[:limit]
@@ -287,6 +364,11 @@ class PersonalizedJobScraper:
     
     async def scrape_handshake(self, keywords: str, location: str = "", limit: int = 10) -> List[Dict[str, Any]]:
         """Scrape jobs from Handshake (student/entry-level focused)"""
+        # Selenium blocks, so drive the browser on a worker thread
+        return await asyncio.to_thread(self._scrape_handshake_sync, keywords, location, limit)
+    
+    def _scrape_handshake_sync(self, keywords: str, location: str, limit: int) -> List[Dict[str, Any]]:
+        """Blocking Selenium scrape of Handshake"""
         jobs = []
         driver = None
         
@@ -294,8 +376,8 @@ class PersonalizedJobScraper:
             driver = self._get_selenium_driver()
             
             # Handshake public job board
-            keywords_encoded = keywords.replace(' ', '%20')
-            search_url = f"https://joinhandshake.com/jobs?query={keywords_encoded}"
+            query = urlencode({'query': keywords}, quote_via=quote)
+            search_url = f"https://joinhandshake.com/jobs?{query}"
             
             driver.get(search_url)
             self._random_delay(3, 5)
@@ -305,7 +387,7 @@ class PersonalizedJobScraper:
             self._random_delay(2, 3)
             
             # Parse with BeautifulSoup
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            soup = BeautifulSoup(driver.page_source, 'lxml')
             
             # Find job cards
             job_cards = soup.find_all('div', class_='job-card')[:limit]
@@ -351,14 +433,15 @@ class PersonalizedJobScraper:
         
         return jobs
     
-    async def scrape_jobs_for_user(self, user_id: str) -> int:
+    async def scrape_jobs_for_user(self, user_id: str, user_data: Optional[Dict[str, Any]] = None) -> int:
         """
         Main method to scrape personalized jobs for a specific user
         Returns count of new jobs added
         """
         try:
-            # Get user profile
-            user_data = await firestore_client.get_user(user_id)
+            # Get user profile unless the caller already has it
+            if user_data is None:
+                user_data = await firestore_client.get_user(user_id)
             
             if not user_data:
                 logger.warning(f"User {user_id} not found")
@@ -376,34 +459,43 @@ class PersonalizedJobScraper:
             keywords = ', '.join(skills[:3]) if skills else ', '.join(interests[:3])
             location = user_data.get('location', '')
             
-            # Scrape from multiple sources with HIGH LIMITS for 300+ jobs
-            all_jobs = []
-            
-            # Indeed - high priority (100 jobs)
-            indeed_jobs = await self.scrape_indeed(keywords, location, limit=100)
-            all_jobs.extend(indeed_jobs)
-            self._random_delay(2, 4)
+            # Scrape from multiple sources with HIGH LIMITS for 300+ jobs.
+            # The Indeed fetch overlaps the Selenium scrapers, but those each
+            # start a headless Chrome, so they take turns (see _selenium_slot)
+            sources = [
+                self.scrape_indeed(keywords, location, limit=100),
+                self._one_browser_at_a_time(self.scrape_linkedin(keywords, location, limit=100)),
+                self._one_browser_at_a_time(self.scrape_glassdoor(keywords, location, limit=100))
+            ]
             
-            # LinkedIn (100 jobs)
-            linkedin_jobs = await self.scrape_linkedin(keywords, location, limit=100)
-            all_jobs.extend(linkedin_jobs)
-            self._random_delay(2, 4)
+            # Handshake (for entry-level/students)
+            if experience in ['Entry Level', 'Student', 'Intern', '']:
+                sources.append(self._one_browser_at_a_time(self.scrape_handshake(keywords, location, limit=100)))
             
-            # Glassdoor (100 jobs)
-            glassdoor_jobs = await self.scrape_glassdoor(keywords, location, limit=100)
-            all_jobs.extend(glassdoor_jobs)
-            self._random_delay(2, 4)
+            all_jobs = []
+            for source_jobs in await asyncio.gather(*sources, return_exceptions=True):
+                if isinstance(source_jobs, Exception):
+                    logger.error(f"Source scrape failed for user {user_id}: {source_jobs}")
+                    continue
+                all_jobs.extend(source_jobs)
             
-            # Handshake (for entry-level/students) (100 jobs)
-            if experience in ['Entry Level', 'Student', 'Intern', '']:
-                handshake_jobs = await self.scrape_handshake(keywords, location, limit=100)
-                all_jobs.extend(handshake_jobs)
-                self._random_delay(2, 4)
+            if not all_jobs:
+                logger.info(f"No jobs scraped for user {user_id}")
+                return 0
             
-            # Validate and store jobs
-            new_jobs_count = 0
+            # Filter out jobs we already have before spending AI calls on them
+            profile_terms = {term.strip().lower() for term in skills + interests if term and term.strip()}
+            candidates = []
+            seen_jobs = set()
             
             for job in all_jobs:
+                # The same posting often shows up on several boards; skip repeats
+                # within this run before paying for a Firestore read and AI call
+                job_key = (job['jobTitle'].strip().lower(), job['company'].strip().lower())
+                if job_key in seen_jobs:
+                    continue
+                seen_jobs.add(job_key)
+                
                 # Check for duplicates
                 is_duplicate = await firestore_client.check_duplicate_job(
                     user_id,
@@ -414,15 +506,39 @@ class PersonalizedJobScraper:
                 if is_duplicate:
                     continue
                 
-                # Validate job relevance with AI
-                validation = await ai_validator.validate_job_relevance(
-                    user_skills=skills,
-                    user_interests=interests,
-                    user_experience=experience,
-                    job_title=job['jobTitle'],
-                    job_description=job['description'],
-                    job_requirements=job.get('requirements', '')
-                )
+                if AI_PREFILTER_ENABLED and profile_terms:
+                    job_text = f"{job['jobTitle']} {job['description']} {job.get('requirements', '')}".lower()
+                    if not any(term in job_text for term in profile_terms):
+                        continue
+                
+                candidates.append(job)
+            
+            # Validate job relevance with AI, a bounded number of calls at a time
+            semaphore = asyncio.Semaphore(AI_VALIDATION_CONCURRENCY)
+            
+            async def validate(job: Dict[str, Any]) -> Dict[str, Any]:
+                async with semaphore:
+                    return await ai_validator.validate_job_relevance(
+                        user_skills=skills,
+                        user_interests=interests,
+                        user_experience=experience,
+                        job_title=job['jobTitle'],
+                        job_description=job['description'],
+                        job_requirements=job.get('requirements', '')
+                    )
+            
+            validations = await asyncio.gather(
+                *(validate(job) for job in candidates),
+                return_exceptions=True
+            )
+            
+            # Store relevant jobs
+            relevant_jobs = []
+            
+            for job, validation in zip(candidates, validations):
+                if isinstance(validation, Exception):
+                    logger.warning(f"AI validation failed for {job['jobTitle']}: {validation}")
+                    continue
                 
                 # Only store relevant jobs (score >= 40) - lowered threshold for more jobs
                 if validation['is_relevant']:
@@ -431,11 +547,13 @@ class PersonalizedJobScraper:
                     job['skillMatches'] = validation['skill_matches']
                     job['skillGaps'] = validation['skill_gaps']
                     
-                    # Store in Firestore
-                    await firestore_client.add_personalized_job(user_id, job)
-                    new_jobs_count += 1
-                    
-                    logger.info(f"Added job for user {user_id}: {job['jobTitle']} (Score: {validation['relevance_score']})")
+                    relevant_jobs.append(job)
+                    logger.debug("Relevant job for user %s: %s (Score: %s)", user_id, job['jobTitle'], validation['relevance_score'])
+            
+            # Store in Firestore, up to 500 jobs per batched write
+            new_jobs_count = 0
+            if relevant_jobs:
+                new_jobs_count = await firestore_client.add_personalized_jobs(user_id, relevant_jobs)
             
             logger.info(f"Scraping complete for user {user_id}. Added {new_jobs_count} new jobs")
             return new_jobs_count
@@ -450,19 +568,26 @@ class PersonalizedJobScraper:
         Returns dictionary of {user_id: jobs_count}
         """
         try:
-            # Get all users from Firestore
-            users_ref = firestore_client.db.collection('users')
-            users = users_ref.stream()
+            # Read every user's profile up front, off the event loop, instead of
+            # holding a Firestore stream open across hours of scraping
+            users = await firestore_client.get_scraping_profiles()
             
             results = {}
             
-            for user_doc in users:
-                user_id = user_doc.id
-                count = await self.scrape_jobs_for_user(user_id)
+            for user_data in users:
+                user_id = user_data['userId']
+                
+                # Nothing gets scraped for these users, so don't pay the rate-limit delay
+                if not user_data.get('skills') and not user_data.get('interests'):
+                    results[user_id] = 0
+                    continue
+                
+                # Reuse the fetched profile instead of reading each user again
+                count = await self.scrape_jobs_for_user(user_id, user_data)
                 results[user_id] = count
                 
                 # Add delay between users to avoid rate limiting
-                self._random_delay(5, 10)
+                await self._async_delay(5, 10)
             
             total_jobs = sum(results.values())
             logger.info(f"Scraping complete for all users. Total new jobs: {total_jobs}")
@@ -3,15 +3,32 @@ OpenAI embeddings utility for semantic search and RAG
 Handles vectorization of job descriptions for similarity matching
 """
 import os
+import hashlib
 from typing import List
-import openai
+import numpy as np
+from openai import AsyncOpenAI
+from cachetools import TTLCache
 from dotenv import load_dotenv
 import logging
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# One client for the process so embeddings requests share its connection pool
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+
+# Repeated queries ("remote data entry", ...) reuse their embedding for an hour
+_embedding_cache = TTLCache(maxsize=10000, ttl=3600)
+
+# Texts per embeddings request
+EMBEDDING_BATCH_SIZE = 100
+
+
+def _embedding_cache_key(text: str, model: str) -> tuple:
+    """Key the embedding cache on model plus a compact digest of the text"""
+    return (model, hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest())
+
 
 class EmbeddingsHandler:
     """Handle OpenAI embeddings for semantic search"""
@@ -19,12 +36,21 @@ class EmbeddingsHandler:
     @staticmethod
     async def generate_embedding(text: str, model: str = "text-embedding-ada-002") -> List[float]:
         """Generate embedding vector for text"""
+        cache_key = _embedding_cache_key(text, model)
+        cached = _embedding_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
         try:
-            response = openai.Embedding.create(
+            if not openai_client:
+                raise Exception("OpenAI not configured")
+            
+            response = await openai_client.embeddings.create(
                 input=text,
                 model=model
             )
-            embedding = response['data'][0]['embedding']
+            embedding = response.data[0].embedding
+            _embedding_cache[cache_key] = tuple(embedding)
             return embedding
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
@@ -34,12 +60,33 @@ class EmbeddingsHandler:
     async def generate_embeddings_batch(texts: List[str], model: str = "text-embedding-ada-002") -> List[List[float]]:
         """Generate embeddings for multiple texts"""
         try:
-            response = openai.Embedding.create(
-                input=texts,
-                model=model
-            )
-            embeddings = [item['embedding'] for item in response['data']]
-            return embeddings
+            keys = [_embedding_cache_key(text, model) for text in texts]
+            
+            # Only send texts we haven't embedded recently, once each
+            vectors = {}
+            missing = {}
+            for text, key in zip(texts, keys):
+                cached = _embedding_cache.get(key)
+                if cached is not None:
+                    vectors[key] = cached
+                elif key not in missing:
+                    missing[key] = text
+            
+            missing_items = list(missing.items())
+            if missing_items and not openai_client:
+                raise Exception("OpenAI not configured")
+            
+            for i in range(0, len(missing_items), EMBEDDING_BATCH_SIZE):
+                chunk = missing_items[i:i + EMBEDDING_BATCH_SIZE]
+                response = await openai_client.embeddings.create(
+                    input=[text for _, text in chunk],
+                    model=model
+                )
+                for (key, _), item in zip(chunk, response.data):
+                    vectors[key] = tuple(item.embedding)
+                    _embedding_cache[key] = vectors[key]
+            
+            return [list(vectors[key]) for key in keys]
         except Exception as e:
             logger.error(f"Error generating batch embeddings: {e}")
             return []
@@ -47,10 +94,10 @@ class EmbeddingsHandler:
     @staticmethod
     def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
         """Calculate cosine similarity between two vectors"""
-        import numpy as np
-        
-        vec1 = np.array(vec1)
-        vec2 = np.array(vec2)
+        # float32 halves the bytes touched versus numpy's float64 default;
+        # ranking by cosine doesn't need more precision than that
+        vec1 = np.asarray(vec1, dtype=np.float32)
+        vec2 = np.asarray(vec2, dtype=np.float32)
         
         dot_product = np.dot(vec1, vec2)
         norm1 = np.linalg.norm(vec1)
@@ -59,7 +106,7 @@ class EmbeddingsHandler:
         if norm1 == 0 or norm2 == 0:
             return 0.0
         
-        return dot_product / (norm1 * norm2)
+        return float(dot_product / (norm1 * norm2))
     
     @staticmethod
     async def find_similar_jobs(query_text: str, job_embeddings: List[tuple]) -> List[tuple]:
@@ -78,15 +125,21 @@ class EmbeddingsHandler:
         if not query_embedding:
             return []
         
-        results = []
-        for job_data, job_embedding in job_embeddings:
-            if job_embedding:
-                similarity = EmbeddingsHandler.cosine_similarity(query_embedding, job_embedding)
-                results.append((job_data, similarity))
+        candidates = [(job_data, job_embedding) for job_data, job_embedding in job_embeddings if job_embedding]
+        if not candidates:
+            return []
+        
+        # Score every job in one matrix-vector product instead of a Python loop
+        matrix = np.asarray([job_embedding for _, job_embedding in candidates], dtype=np.float32)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        dots = matrix @ query
+        similarities = np.divide(dots, norms, out=np.zeros_like(dots), where=norms != 0)
         
         # Sort by similarity (highest first)
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results
+        order = np.argsort(-similarities, kind='stable')
+        return [(candidates[i][0], float(similarities[i])) for i in order]
 
 # Global instance
 embeddings_handler = EmbeddingsHandler()
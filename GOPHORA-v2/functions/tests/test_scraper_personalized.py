@@ -0,0 +1,67 @@
+"""
+Personalized scraper tests
+Firebase is patched out so the scraper module imports without credentials
+"""
+import asyncio
+import os
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+with mock.patch("firebase_admin.initialize_app"), mock.patch("firebase_admin.firestore.client"):
+    from backend.services import scraper_personalized
+
+
+def _run_user_scrape(monkeypatch, jobs, skills):
+    """Scrape a user whose sources return `jobs`; returns the titles sent to AI validation"""
+    scraper = scraper_personalized.personalized_scraper
+    validated = []
+
+    async def fake_source(*args, **kwargs):
+        return [dict(job) for job in jobs]
+
+    async def fake_validate(**kwargs):
+        validated.append(kwargs['job_title'])
+        return {
+            'relevance_score': 80,
+            'reasoning': '',
+            'is_relevant': True,
+            'skill_matches': [],
+            'skill_gaps': []
+        }
+
+    async def not_duplicate(*args):
+        return False
+
+    async def store(user_id, relevant_jobs):
+        return len(relevant_jobs)
+
+    for source in ('scrape_indeed', 'scrape_linkedin', 'scrape_glassdoor', 'scrape_handshake'):
+        monkeypatch.setattr(scraper, source, fake_source)
+    monkeypatch.setattr(scraper_personalized.ai_validator, 'validate_job_relevance', fake_validate)
+    monkeypatch.setattr(scraper_personalized.firestore_client, 'check_duplicate_job', not_duplicate)
+    monkeypatch.setattr(scraper_personalized.firestore_client, 'add_personalized_jobs', store)
+
+    user_data = {'skills': skills, 'interests': [], 'experience': 'Senior'}
+    asyncio.run(scraper.scrape_jobs_for_user('user-1', user_data))
+    return validated
+
+
+def test_job_without_term_overlap_reaches_validation_when_prefilter_off(monkeypatch):
+    monkeypatch.setattr(scraper_personalized, 'AI_PREFILTER_ENABLED', False)
+    job = {
+        'jobTitle': 'Frontend Engineer',
+        'company': 'Acme',
+        'description': 'Build React apps in JavaScript',
+        'requirements': ''
+    }
+
+    # "JS" is not a substring of the posting, but the AI check should still see it
+    assert _run_user_scrape(monkeypatch, [job], ['JS']) == ['Frontend Engineer']
+
+
+def test_prefilter_is_off_by_default():
+    if 'AI_PREFILTER_ENABLED' in os.environ:
+        return
+    assert scraper_personalized.AI_PREFILTER_ENABLED is False